@@ -1,7 +1,13 @@
+import sys
+from pathlib import Path
 from google import genai
-from google.genai import types
 import json
 
+# Shared agent helpers (conversation buffer, context cache) live in 08_Agentic_AI
+sys.path.append(str(Path(__file__).resolve().parents[1] / "08_Agentic_AI"))
+from agent.context_cache import GeminiContextCache
+from agent.history import ConversationBuffer
+
 client = genai.Client(
     api_key=''  # Add your API key here
 )
@@ -38,40 +44,27 @@ response_schema = {
 }
 
 
-def format_message_history_as_text(messages):
-    lines = []
-    for msg in messages:
-        role = msg["role"]
-        content = msg["content"]
-        # Format roles like SYSTEM:, USER:, ASSISTANT:
-        lines.append(f"{role.upper()}: {content}")
-    return "\n".join(lines)
-
-
 print("\n\n\n")
 
-message_history = [
-    {"role": "system", "content": SYSTEM_PROMPT}
-]
+# Lines are formatted once, when appended; SYSTEM_PROMPT only goes in the system instruction
+message_history = ConversationBuffer(SYSTEM_PROMPT)
+context_cache = GeminiContextCache(client, "gemini-2.5-flash", SYSTEM_PROMPT)
 
 user_query = input("👉 ")
-message_history.append({"role": "user", "content": user_query})
+message_history.append("user", user_query)
 
 while True:
-    prompt_text = format_message_history_as_text(message_history)
-
     response = client.models.generate_content(
         model="gemini-2.5-flash",
-        contents=prompt_text,
-        config=types.GenerateContentConfig(
-            system_instruction=SYSTEM_PROMPT,
+        contents=message_history.text,
+        config=context_cache.config(
             response_mime_type="application/json",
             response_schema=response_schema
         )
     )
 
     raw_result = response.candidates[0].content.parts[0].text
-    message_history.append({"role": "assistant", "content": raw_result})
+    message_history.append("assistant", raw_result)
 
     # Parse JSON string from model response
     parsed_result = json.loads(raw_result)
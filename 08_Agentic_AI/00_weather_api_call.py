@@ -1,20 +1,12 @@
 from google import genai
 from google.genai import types
-import requests
+import asyncio
+from agent.weather import get_weather
 
 client = genai.Client(
     api_key=''
 )
 
-def get_weather(city: str):
-    url = f"https://wttr.in/{city.lower()}?format=%C+%t"
-    response = requests.get(url)
-
-    if response.status_code == 200:
-        return f"The weather in {city} is {response.text}."
-    else:
-        return f"Failed to fetch weather."
-
 def main():
     user_query = input("> ")
     response = client.models.generate_content(
@@ -27,5 +19,5 @@ def main():
 
     print("🤖:", response.candidates[0].content.parts[0].text)
 
-print(get_weather("bengaluru"))
+print(asyncio.run(get_weather("bengaluru")))
 # main()
\ No newline at end of file
@@ -1,26 +1,19 @@
 from google import genai
 from google.genai import types
 from pydantic import BaseModel, Field
-from typing import Optional
-import requests
+from typing import List, Optional
 import json
+from agent.tools import ToolCall, ToolRunner, observe_message, tool_calls
+from agent.weather import get_weather
 
 client = genai.Client(
     api_key=''
 )
 
-def get_weather(city: str):
-    url = f"https://wttr.in/{city.lower()}?format=%C+%t"
-    response = requests.get(url)
-
-    if response.status_code == 200:
-        return f"The weather in {city} is {response.text}."
-    else:
-        return f"Failed to fetch weather."
-
 available_tools = {
     "get_weather": get_weather
 }
+tool_runner = ToolRunner(available_tools)
 
 SYSTEM_PROMPT = """
     You are an expert AI Assistant in resolving user queries using chain of thought.
@@ -34,9 +27,10 @@ SYSTEM_PROMPT = """
     - The sequence of steps is START (where user gives an input), PLAN (That can be multiple times) and finally OUTPUT (which is going to be displayed to the user).
     - You can also call a tool if required from the list of available tools.
     - For every tool call wait for the observe step which is the output from the called tool.
+    - When several independent tool calls are needed (e.g. the weather of several cities), put them all in ONE TOOL step as a "tools" list. They run in parallel and all outputs come back in one OBSERVE step.
 
     Output JSON Format:
-    { "step": "START" | "PLAN" | "OUTPUT" | "TOOL" , "content": "string", "tool": "string", "input": "string"}
+    { "step": "START" | "PLAN" | "OUTPUT" | "TOOL" , "content": "string", "tool": "string", "input": "string", "tools": [{"tool": "string", "input": "string"}]}
 
     Available Tools:
     - get_weather: Takes city name as an input string and returns the weatther info about the city.
@@ -65,6 +59,13 @@ SYSTEM_PROMPT = """
     PLAN: { "step": "OBSERVE": , "tool": "get_weather", "output": "The weather in bengaluru is cloudy with 20 degrees Celcius"}
     PLAN: { "step": "PLAN": , "content": "Great, I got the weather info about Bengaluru"}
     OUTPUT: {"step": "OUTPUT", "content": "The current weather in Bengaluru is 20C with some cloudy sky."}
+
+    Example 3:
+    START: Compare the weather of Delhi, Mumbai and Goa
+    PLAN: { "step": "PLAN": , "content": "User wants the weather of three cities, the calls are independent"}
+    PLAN: { "step": "TOOL": , "tools": [{"tool": "get_weather", "input": "delhi"}, {"tool": "get_weather", "input": "mumbai"}, {"tool": "get_weather", "input": "goa"}]}
+    PLAN: { "step": "OBSERVE": , "results": [{"tool": "get_weather", "input": "delhi", "output": "The weather in delhi is Sunny +31°C."}, {"tool": "get_weather", "input": "mumbai", "output": "The weather in mumbai is Haze +29°C."}, {"tool": "get_weather", "input": "goa", "output": "The weather in goa is Light rain +27°C."}]}
+    OUTPUT: {"step": "OUTPUT", "content": "Delhi is the warmest at 31C and sunny, Mumbai is hazy at 29C and Goa has light rain at 27C."}
 """
 
 # response_schema = {
@@ -83,6 +84,7 @@ class MyOutputFormat(BaseModel):
     content: Optional[str] = Field(None, description="The optional string content for the step")
     tool: Optional[str] = Field(None, description="The ID of the tool to call.")
     input: Optional[str] = Field(None, description="Input params for the tool")
+    tools: Optional[List[ToolCall]] = Field(None, description="Several tool calls, run in parallel")
 
 
 
@@ -137,22 +139,17 @@ while True:
             continue
         
         if parsed_result.step == 'TOOL':
-            tool_to_call = parsed_result.tool
-            tool_input = parsed_result.input
-            if not tool_to_call or tool_to_call not in available_tools:
+            calls = tool_calls(parsed_result)
+            if not calls or any(call.tool not in available_tools for call in calls):
                 print(f"❌ Invalid or missing tool in response: {parsed_result}")
                 break
-            print(f"🔨: {tool_to_call} ({tool_input})")
-            tool_response = available_tools[tool_to_call](tool_input)
-            print(f"🔨: {tool_to_call} ({tool_input}) = {tool_response}")
-            message_history.append({"role": "developer", "content": json.dumps(
-                {
-                    "step": "OBSERVE",
-                    "tool": tool_to_call,
-                    "input": tool_input,
-                    "output": tool_response
-                }
-            )})
+            for call in calls:
+                print(f"🔨: {call.tool} ({call.input})")
+            # All calls of the step run concurrently, their outputs go back in one OBSERVE message
+            results = tool_runner.run(calls)
+            for result in results:
+                print(f"🔨: {result['tool']} ({result['input']}) = {result['output']}")
+            message_history.append({"role": "developer", "content": observe_message(results)})
             continue
 
         if parsed_result.step == 'OUTPUT':
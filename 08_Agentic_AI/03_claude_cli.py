@@ -1,32 +1,27 @@
 from google import genai
 from google.genai import types
 from pydantic import BaseModel, Field
-from typing import Optional
-import requests
+from typing import List, Optional
 import json
 import os
+from agent.context_cache import GeminiContextCache
+from agent.history import ConversationBuffer
+from agent.tools import ToolCall, ToolRunner, observe_message, tool_calls
+from agent.commands import run_command
+from agent.weather import get_weather
 
 client = genai.Client(
     api_key=''
 )
 
-def run_command(cmd: str):
-    result = os.system(cmd)
-    return result
-
-def get_weather(city: str):
-    url = f"https://wttr.in/{city.lower()}?format=%C+%t"
-    response = requests.get(url)
-
-    if response.status_code == 200:
-        return f"The weather in {city} is {response.text}."
-    else:
-        return f"Failed to fetch weather."
+MODEL = "gemini-2.5-flash"
+HISTORY_BUDGET_TOKENS = int(os.getenv("HISTORY_BUDGET_TOKENS", "8000"))
 
 available_tools = {
     "get_weather": get_weather,
     "run_command": run_command
 }
+tool_runner = ToolRunner(available_tools)
 
 SYSTEM_PROMPT = """
     You are an expert AI Assistant in resolving user queries using chain of thought.
@@ -40,13 +35,14 @@ SYSTEM_PROMPT = """
     - The sequence of steps is START (where user gives an input), PLAN (That can be multiple times) and finally OUTPUT (which is going to be displayed to the user).
     - You can also call a tool if required from the list of available tools.
     - For every tool call wait for the observe step which is the output from the called tool.
+    - When several independent tool calls are needed (e.g. the weather of several cities), put them all in ONE TOOL step as a "tools" list. They run in parallel and all outputs come back in one OBSERVE step.
 
     Output JSON Format:
-    { "step": "START" | "PLAN" | "OUTPUT" | "TOOL" , "content": "string", "tool": "string", "input": "string"}
+    { "step": "START" | "PLAN" | "OUTPUT" | "TOOL" , "content": "string", "tool": "string", "input": "string", "tools": [{"tool": "string", "input": "string"}]}
 
     Available Tools:
     - get_weather(city: str): Takes city name as an input string and returns the weatther info about the city.
-    - run_command(cmd: str): Takes a system linux command as string and executes the command on user's system and returns the output from that command.
+    - run_command(cmd: str): Takes a system linux command as string and executes the command on user's system and returns the exit code and the output from that command (long output is truncated, commands are killed after a time limit). Independent commands can run in parallel in one TOOL step.
 
     Example 1:
     START: Hey, can you solve 2 + 3 * 5 / 10
@@ -71,6 +67,13 @@ SYSTEM_PROMPT = """
     PLAN: { "step": "OBSERVE": , "tool": "get_weather", "output": "The weather in bengaluru is cloudy with 20 degrees Celcius"}
     PLAN: { "step": "PLAN": , "content": "Great, I got the weather info about Bengaluru"}
     OUTPUT: {"step": "OUTPUT", "content": "The current weather in Bengaluru is 20C with some cloudy sky."}
+
+    Example 3:
+    START: Compare the weather of Delhi, Mumbai and Goa
+    PLAN: { "step": "PLAN": , "content": "User wants the weather of three cities, the calls are independent"}
+    PLAN: { "step": "TOOL": , "tools": [{"tool": "get_weather", "input": "delhi"}, {"tool": "get_weather", "input": "mumbai"}, {"tool": "get_weather", "input": "goa"}]}
+    PLAN: { "step": "OBSERVE": , "results": [{"tool": "get_weather", "input": "delhi", "output": "The weather in delhi is Sunny +31°C."}, {"tool": "get_weather", "input": "mumbai", "output": "The weather in mumbai is Haze +29°C."}, {"tool": "get_weather", "input": "goa", "output": "The weather in goa is Light rain +27°C."}]}
+    OUTPUT: {"step": "OUTPUT", "content": "Delhi is the warmest at 31C and sunny, Mumbai is hazy at 29C and Goa has light rain at 27C."}
 """
 
 # response_schema = {
@@ -89,38 +92,32 @@ class MyOutputFormat(BaseModel):
     content: Optional[str] = Field(None, description="The optional string content for the step")
     tool: Optional[str] = Field(None, description="The ID of the tool to call.")
     input: Optional[str] = Field(None, description="Input params for the tool")
-
-
-
-def format_message_history_as_text(messages):
-    lines = []
-    for msg in messages:
-        role = msg["role"]
-        content = msg["content"]
-        # Format roles like SYSTEM:, USER:, ASSISTANT:
-        lines.append(f"{role.upper()}: {content}")
-    return "\n".join(lines)
+    tools: Optional[List[ToolCall]] = Field(None, description="Several tool calls, run in parallel")
 
 
 print("\n\n\n")
 
-message_history = [
-    {"role": "system", "content": SYSTEM_PROMPT}
-]
+# History lines are formatted once, when appended; SYSTEM_PROMPT is only sent as the
+# system instruction (from Gemini's context cache when the prompt is big enough for one)
+message_history = ConversationBuffer(SYSTEM_PROMPT)
+context_cache = GeminiContextCache(client, MODEL, SYSTEM_PROMPT)
+# Older turns are compacted (PLAN steps summarized, observations truncated) once the
+# history outgrows the budget, so per-turn prompt size stays flat in long sessions
 
 
 while True:
     user_query = input("👉 ")
-    message_history.append({"role": "user", "content": user_query})
+    message_history.append("user", user_query)
 
     while True:
-        prompt_text = format_message_history_as_text(message_history)
+        # Before every call: one long PLAN/TOOL chain can outgrow the budget too
+        if message_history.compact(HISTORY_BUDGET_TOKENS):
+            print(f"🗜️ history compacted to {message_history.total_tokens} tokens")
 
         response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt_text,
-            config=types.GenerateContentConfig(
-                system_instruction=SYSTEM_PROMPT,
+            model=MODEL,
+            contents=message_history.text,
+            config=context_cache.config(
                 response_mime_type="application/json",
                 response_schema=MyOutputFormat
             )
@@ -128,7 +125,7 @@ while True:
 
         # parsed_result = response.candidates[0].content.parts[0].parsed
         parsed_result = response.parsed
-        message_history.append({"role": "assistant", "content": parsed_result})
+        message_history.append("assistant", parsed_result)
 
         # Parse JSON string from model response
         # parsed_result = json.loads(raw_result)
@@ -143,22 +140,17 @@ while True:
             continue
         
         if parsed_result.step == 'TOOL':
-            tool_to_call = parsed_result.tool
-            tool_input = parsed_result.input
-            if not tool_to_call or tool_to_call not in available_tools:
+            calls = tool_calls(parsed_result)
+            if not calls or any(call.tool not in available_tools for call in calls):
                 print(f"❌ Invalid or missing tool in response: {parsed_result}")
                 break
-            print(f"🔨: {tool_to_call} ({tool_input})")
-            tool_response = available_tools[tool_to_call](tool_input)
-            print(f"🔨: {tool_to_call} ({tool_input}) = {tool_response}")
-            message_history.append({"role": "developer", "content": json.dumps(
-                {
-                    "step": "OBSERVE",
-                    "tool": tool_to_call,
-                    "input": tool_input,
-                    "output": tool_response
-                }
-            )})
+            for call in calls:
+                print(f"🔨: {call.tool} ({call.input})")
+            # All calls of the step run concurrently, their outputs go back in one OBSERVE message
+            results = tool_runner.run(calls)
+            for result in results:
+                print(f"🔨: {result['tool']} ({result['input']}) = {result['output']}")
+            message_history.append("developer", observe_message(results))
             continue
 
         if parsed_result.step == 'OUTPUT':
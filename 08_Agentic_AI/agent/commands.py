@@ -0,0 +1,161 @@
+"""
+run_command tool
+---------------------------------
+os.system(cmd) blocked the agent until the command finished, had no time limit and
+returned only the exit code, so the model never saw what the command printed.
+run_command runs the command as an asyncio subprocess instead:
+
+- stdout and stderr are read as they come and echoed to the terminal, line by line,
+  tagged with the command ("[2 npm run build]") so parallel commands stay readable
+- the model gets exit code + output, capped at RUN_COMMAND_MAX_OUTPUT bytes
+  (the rest is still drained, so a chatty command can't fill the pipe and hang)
+- wall-clock limit: after RUN_COMMAND_TIMEOUT seconds the whole process tree is killed
+- memory limit: the resident memory (RSS) of the process tree is sampled with psutil,
+  over RUN_COMMAND_MEMORY_MB it is killed. RSS, not RLIMIT_AS: JVM, Go and V8 reserve
+  far more address space than they use and would not even start under an AS limit
+- it is a coroutine, so several commands of one TOOL step run in parallel (ToolRunner)
+"""
+
+import asyncio
+import itertools
+import os
+import signal
+import sys
+
+import psutil
+
+RUN_COMMAND_TIMEOUT = float(os.getenv("RUN_COMMAND_TIMEOUT", "120"))
+RUN_COMMAND_MAX_OUTPUT = int(os.getenv("RUN_COMMAND_MAX_OUTPUT", "16384"))
+RUN_COMMAND_MEMORY_MB = int(os.getenv("RUN_COMMAND_MEMORY_MB", "2048"))
+MEMORY_POLL_SECONDS = 0.2
+
+_command_ids = itertools.count(1)
+
+
+class Echo:
+    """Shows a command's output live, whole lines only, each tagged with the command."""
+
+    def __init__(self, cmd: str):
+        short = cmd if len(cmd) <= 24 else cmd[:23] + "…"
+        self.tag = f"[{next(_command_ids)} {short}]"
+        self._partial = {"stdout": b"", "stderr": b""}
+
+    def _print(self, stream: str, line: bytes):
+        marker = "│" if stream == "stdout" else "│!"
+        sys.stdout.write(f"{self.tag}{marker} {line.decode(errors='replace')}\n")
+
+    def write(self, stream: str, chunk: bytes):
+        *lines, self._partial[stream] = (self._partial[stream] + chunk).split(b"\n")
+        if len(self._partial[stream]) > 8192:  # progress bars etc. never end the line
+            lines.append(self._partial[stream])
+            self._partial[stream] = b""
+        for line in lines:
+            self._print(stream, line)
+        sys.stdout.flush()
+
+    def flush(self):
+        for stream, rest in self._partial.items():
+            if rest:
+                self._print(stream, rest)
+        self._partial = {"stdout": b"", "stderr": b""}
+        sys.stdout.flush()
+
+
+def _tree(pid: int):
+    try:
+        parent = psutil.Process(pid)
+        return [parent] + parent.children(recursive=True)
+    except psutil.Error:  # gone, or not ours to inspect
+        return []
+
+
+def _tree_rss(pid: int) -> int:
+    total = 0
+    for process in _tree(pid):
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:  # exited in between
+            pass
+    return total
+
+
+def _kill_tree(process):
+    if hasattr(os, "killpg"):  # POSIX: the command runs in its own process group
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    # Windows has no process groups; on POSIX this catches children that left the group
+    for child in _tree(process.pid)[1:]:
+        try:
+            child.kill()
+        except psutil.Error:
+            pass
+    try:
+        process.kill()
+    except ProcessLookupError:
+        pass
+
+
+async def _watch_memory(pid: int, limit_bytes: int):
+    """Returns once the tree's RSS goes over the limit (cancelled when the command ends)."""
+    while _tree_rss(pid) <= limit_bytes:
+        await asyncio.sleep(MEMORY_POLL_SECONDS)
+
+
+async def run_command(
+    cmd: str,
+    timeout: float = RUN_COMMAND_TIMEOUT,
+    max_output: int = RUN_COMMAND_MAX_OUTPUT,
+    memory_mb: int = RUN_COMMAND_MEMORY_MB,
+    echo: bool = True
+):
+    process = await asyncio.create_subprocess_shell(
+        cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True  # own process group (POSIX), so a kill reaches its children too
+    )
+    live = Echo(cmd) if echo else None
+
+    output = bytearray()
+    dropped = 0
+
+    async def pump(reader, stream: str):
+        nonlocal dropped
+        while chunk := await reader.read(4096):
+            if live is not None:
+                live.write(stream, chunk)
+            keep = max(0, max_output - len(output))
+            output.extend(chunk[:keep])
+            dropped += len(chunk) - min(keep, len(chunk))
+
+    command = asyncio.ensure_future(
+        asyncio.gather(pump(process.stdout, "stdout"), pump(process.stderr, "stderr"), process.wait())
+    )
+    watchers = [command]
+    if memory_mb > 0:
+        watchers.append(asyncio.ensure_future(_watch_memory(process.pid, memory_mb * 2 ** 20)))
+
+    killed = None
+    try:
+        done, _ = await asyncio.wait(watchers, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if command not in done:
+            killed = f"killed after {timeout:g}s time limit" if not done else f"killed: over {memory_mb} MB of memory"
+            _kill_tree(process)
+            await process.wait()
+            command.cancel()
+    finally:
+        for watcher in watchers:
+            watcher.cancel()
+        await asyncio.gather(*watchers, return_exceptions=True)
+        if live is not None:
+            live.flush()
+
+    result = f"exit code {process.returncode}\n{output.decode(errors='replace')}"
+    if dropped:
+        result += f"\n[output truncated: {dropped} more bytes]"
+    if killed:
+        result += f"\n[{killed}]"
+    return result
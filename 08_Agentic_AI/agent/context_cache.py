@@ -0,0 +1,55 @@
+"""
+Gemini context caching
+---------------------------------
+SYSTEM_PROMPT is the same for every request of a session. With an explicit
+context cache it is uploaded once and referenced by name (cached_content),
+cached input tokens are billed at a reduced rate and are not re-processed.
+
+Explicit caches need a minimum prompt size (about 1k tokens for gemini-2.5-flash);
+when creation fails the prompt is sent as system_instruction instead. Gemini 2.5
+also caches repeated prefixes implicitly, which ConversationBuffer's append-only
+history benefits from either way.
+"""
+
+import time
+
+from google.genai import types
+
+
+class GeminiContextCache:
+    def __init__(self, client, model: str, system_prompt: str, ttl_seconds: int = 3600):
+        self.client = client
+        self.model = model
+        self.system_prompt = system_prompt
+        self.ttl_seconds = ttl_seconds
+        self.error = None  # why the explicit cache is not used, if it isn't
+
+        self._name = None
+        self._expires = 0.0
+
+    def _cache_name(self):
+        if self.error is not None:
+            return None
+        # Re-create shortly before the TTL runs out (long sessions outlive it)
+        if self._name is None or time.time() > self._expires - 60:
+            try:
+                cache = self.client.caches.create(
+                    model=self.model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=self.system_prompt,
+                        ttl=f"{self.ttl_seconds}s"
+                    )
+                )
+            except Exception as e:  # prompt below the model's minimum, caching not available, ...
+                self.error = e
+                return None
+            self._name = cache.name
+            self._expires = time.time() + self.ttl_seconds
+        return self._name
+
+    def config(self, **kwargs) -> types.GenerateContentConfig:
+        """GenerateContentConfig that carries the system prompt exactly once."""
+        name = self._cache_name()
+        if name is not None:
+            return types.GenerateContentConfig(cached_content=name, **kwargs)
+        return types.GenerateContentConfig(system_instruction=self.system_prompt, **kwargs)
@@ -0,0 +1,218 @@
+"""
+Conversation buffer
+---------------------------------
+The agent loops used to rebuild the whole prompt on every step:
+format_message_history_as_text(message_history) re-formatted every message,
+SYSTEM_PROMPT included, and SYSTEM_PROMPT was sent a second time as
+system_instruction. ConversationBuffer formats each message once, when it is
+appended:
+
+- text: the history as "ROLE: content" lines, extended by one line per append
+- chat_messages: the same history as chat messages (OpenAI style), extended in place
+- the system prompt is kept apart: system_instruction (Gemini) or the first chat message,
+  never inside the text
+- every message's token count is computed once (tiktoken, like 04_LLM/01_tokenization.py)
+
+Appending never rewrites earlier messages, so the prompt prefix stays byte-identical
+from step to step and the providers' prompt caches can reuse it.
+
+compact(budget_tokens) keeps long sessions under a token budget: older turns lose their
+PLAN steps (one short summary step instead) and their tool observations are truncated;
+if that is not enough the oldest turns are dropped. The system prompt is never touched,
+the last turns only lose tool output when they alone are over the budget. It compacts
+down to 75% of the budget, so it runs once in a while instead of on every step (each
+compaction changes the cached prefix), and a call that has nothing left to cut changes
+nothing.
+"""
+
+import json
+from dataclasses import dataclass
+
+
+def to_text(content) -> str:
+    """Message content as sent to the model: pydantic models and dicts become JSON."""
+    if hasattr(content, "model_dump_json"):
+        return content.model_dump_json(exclude_none=True)
+    if isinstance(content, (dict, list)):
+        return json.dumps(content)
+    return str(content)
+
+
+def step_of(content: str):
+    """The "step" of a JSON agent message (PLAN, TOOL, OBSERVE, ...), else None."""
+    if not content.startswith("{"):
+        return None
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return None
+    return data.get("step") if isinstance(data, dict) else None
+
+
+class TokenCounter:
+    def __init__(self, model: str = "gpt-4o"):
+        self.model = model
+        self._encoding = None
+
+    @property
+    def encoding(self):
+        if self._encoding is None:
+            import tiktoken
+            self._encoding = tiktoken.encoding_for_model(self.model)
+        return self._encoding
+
+    def __call__(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return self.encoding.decode(tokens[:max_tokens]) + " …[truncated]"
+
+
+@dataclass
+class Message:
+    role: str
+    content: str
+    tokens: int
+    step: str = None
+
+
+class ConversationBuffer:
+    def __init__(self, system_prompt: str = "", count_tokens=None):
+        self.system_prompt = system_prompt
+        self.count_tokens = count_tokens or TokenCounter()
+        self.system_tokens = self.count_tokens(system_prompt) if system_prompt else 0
+        self.messages = []
+        self.tokens = 0  # history only, without the system prompt
+        self.compactions = 0
+
+        self._text = ""
+        self._chat = [{"role": "system", "content": system_prompt}] if system_prompt else []
+
+    def __len__(self):
+        return len(self.messages)
+
+    @staticmethod
+    def format_line(role: str, content: str) -> str:
+        # Format roles like USER:, ASSISTANT:, DEVELOPER:
+        return f"{role.upper()}: {content}"
+
+    def _message(self, role: str, content: str) -> Message:
+        return Message(role, content, self.count_tokens(self.format_line(role, content)), step_of(content))
+
+    def append(self, role: str, content) -> Message:
+        content = to_text(content)
+        line = self.format_line(role, content)
+        message = self._message(role, content)
+        self.messages.append(message)
+        self.tokens += message.tokens
+
+        self._text = f"{self._text}\n{line}" if self._text else line
+        self._chat.append({"role": role, "content": content})
+        return message
+
+    @property
+    def text(self) -> str:
+        """History as text, for contents=...; the system prompt goes in system_instruction."""
+        return self._text
+
+    @property
+    def chat_messages(self):
+        """System prompt + history as chat messages, for messages=... (don't mutate)."""
+        return self._chat
+
+    @property
+    def total_tokens(self) -> int:
+        return self.system_tokens + self.tokens
+
+    # ---------------------------
+    # 🗜️ COMPACTION
+    # ---------------------------
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        if hasattr(self.count_tokens, "truncate"):
+            return self.count_tokens.truncate(text, max_tokens)
+        return text if len(text) <= 4 * max_tokens else text[:4 * max_tokens] + " …[truncated]"
+
+    def _truncate_observation(self, message: Message, max_tokens: int) -> Message:
+        """OBSERVE message with its tool outputs cut to max_tokens; the same message if nothing was cut."""
+        data = json.loads(message.content)
+        changed = False
+        for result in data.get("results") or [data]:  # one OBSERVE may carry several tool results
+            output = str(result.get("output"))
+            if output.endswith("…[truncated]"):  # already cut by an earlier compaction
+                continue
+            short = self._truncate(output, max_tokens)
+            if short != output:
+                result["output"] = short
+                changed = True
+        return self._message(message.role, json.dumps(data)) if changed else message
+
+    def _rebuild(self, messages):
+        self.messages = list(messages)
+        self.tokens = sum(message.tokens for message in self.messages)
+        self._text = "\n".join(self.format_line(m.role, m.content) for m in self.messages)
+        self._chat = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        self._chat.extend({"role": m.role, "content": m.content} for m in self.messages)
+
+    def compact(self, budget_tokens: int, keep_turns: int = 2, observation_tokens: int = 200, plan_tokens: int = 60):
+        """Shrink the history when system prompt + history is over budget_tokens; True if it did.
+
+        keep_turns: the last user turns (user message + everything after it) kept verbatim,
+        unless they alone don't fit: then their tool outputs are truncated too. Returns False
+        (and leaves the history, so the cached prefix, untouched) when nothing can be cut.
+        Cheap when under budget: call it before every model call.
+        """
+        if self.total_tokens <= budget_tokens:
+            return False
+        target = int(budget_tokens * 0.75)
+
+        user_rows = [i for i, message in enumerate(self.messages) if message.role == "user"]
+        pinned_from = user_rows[-keep_turns] if len(user_rows) >= keep_turns else 0
+        older, recent = self.messages[:pinned_from], self.messages[pinned_from:]
+
+        compacted, plans = [], []
+
+        def flush_plans():
+            if plans:
+                summary = self._truncate(" / ".join(plans), plan_tokens)
+                compacted.append(self._message("assistant", json.dumps(
+                    {"step": "PLAN", "content": f"({len(plans)} earlier steps) {summary}", "compacted": len(plans)}
+                )))
+                plans.clear()
+
+        for message in older:
+            if message.step in ("START", "PLAN"):
+                data = json.loads(message.content)
+                if "compacted" not in data:  # summaries of earlier compactions stay as they are
+                    plans.append(data.get("content") or "")
+                    continue
+            flush_plans()
+            if message.step == "OBSERVE":
+                message = self._truncate_observation(message, observation_tokens)
+            compacted.append(message)
+        flush_plans()
+
+        # Still too big: drop whole turns, oldest first
+        def total():
+            return self.system_tokens + sum(m.tokens for m in compacted) + sum(m.tokens for m in recent)
+
+        while compacted and total() > target:
+            next_turn = next((i for i in range(1, len(compacted)) if compacted[i].role == "user"), len(compacted))
+            del compacted[:next_turn]
+
+        # The pinned turns alone don't fit (e.g. one long tool chain): truncate their tool outputs
+        if total() > target:
+            recent = [
+                self._truncate_observation(m, observation_tokens) if m.step == "OBSERVE" else m
+                for m in recent
+            ]
+
+        messages = compacted + recent
+        if len(messages) == len(self.messages) and all(a is b for a, b in zip(messages, self.messages)):
+            return False  # nothing left to cut
+        self._rebuild(messages)
+        self.compactions += 1
+        return True
@@ -0,0 +1,54 @@
+"""
+Local stand-in for wttr.in, to exercise the tools without the network.
+
+    python -m agent.stub_server --port 8765 --delay 0.5
+
+GET /<city>?format=... answers "Sunny +25°C" after --delay seconds and counts
+the requests it got per path (GET /_stats), so caching and coalescing are visible.
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+hits = Counter()
+
+
+def make_handler(delay: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if path == "/_stats":
+                body = json.dumps(hits).encode()
+            else:
+                hits[path] += 1
+                time.sleep(delay)
+                body = "Sunny +25°C".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="wttr.in stub")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.delay))
+    print(f"☁️ stub weather server on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
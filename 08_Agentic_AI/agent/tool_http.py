@@ -0,0 +1,97 @@
+"""
+Shared HTTP client for tools
+---------------------------------
+Every get_weather used to do a fresh requests.get: new DNS + TCP + TLS handshake
+per call, no timeout, and the same city fetched again on every question.
+ToolHTTP is shared by all tools of a session:
+
+- one httpx.AsyncClient: keep-alive connection pool, HTTP/2 when h2 is installed,
+  connect retries, timeouts
+- per-tool TTL caches (cachetools), only successful responses are cached
+- identical requests already in flight are coalesced: 5 parallel "weather in delhi"
+  calls make one HTTP request
+
+The client is created on first use, on the running loop, so use it from one loop
+(ToolRunner keeps one loop per session).
+"""
+
+import asyncio
+import os
+
+import httpx
+from cachetools import TTLCache
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+TOOL_HTTP_TIMEOUT = float(os.getenv("TOOL_HTTP_TIMEOUT", "10"))
+
+
+class ToolHTTP:
+    def __init__(self, timeout: float = TOOL_HTTP_TIMEOUT, max_connections: int = 20, retries: int = 2):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.retries = retries
+        self.requests = 0  # actual network requests
+        self.cache_hits = 0
+        self.coalesced = 0
+
+        self._client = None
+        self._caches = {}
+        self._in_flight = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            # http2 / limits go on the transport, the client's own are ignored when one is given
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                transport=httpx.AsyncHTTPTransport(http2=HTTP2, limits=limits, retries=self.retries),
+                follow_redirects=True
+            )
+        return self._client
+
+    def add_cache(self, name: str, ttl: float, maxsize: int = 1024):
+        self._caches[name] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def _fetch(self, url: str):
+        self.requests += 1
+        response = await self.client.get(url)
+        return response.status_code, response.text
+
+    async def get(self, url: str, cache: str = None):
+        """(status code, text) of GET url; served from the named cache when fresh."""
+        key = (cache, url)
+        store = self._caches.get(cache)
+        if store is not None and url in store:
+            self.cache_hits += 1
+            return store[url]
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._fetch(url))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # shield: one cancelled caller must not cancel the request the others wait for
+        status, text = await asyncio.shield(task)
+        if store is not None and status == 200:
+            store[url] = (status, text)
+        return status, text
+
+    def stats(self):
+        return {"requests": self.requests, "cache_hits": self.cache_hits, "coalesced": self.coalesced}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+tool_http = ToolHTTP()
@@ -0,0 +1,80 @@
+"""
+Concurrent tool calls
+---------------------------------
+With one TOOL step per model round trip, "weather in 5 cities" costs 5 LLM calls
+and 5 sequential HTTP calls. A TOOL step may instead carry a list of calls:
+
+    { "step": "TOOL", "tools": [{"tool": "get_weather", "input": "delhi"},
+                                {"tool": "get_weather", "input": "goa"}] }
+
+All calls of the step run concurrently (async tools on the event loop, plain
+functions in worker threads) and their results go back in ONE OBSERVE message.
+The old single-call form ("tool" + "input") still works.
+
+ToolRunner keeps one event loop for the whole session (asyncio.Runner), so async
+tools can share clients that are bound to a loop.
+"""
+
+import asyncio
+import inspect
+import json
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ToolCall(BaseModel):
+    tool: str = Field(..., description="The ID of the tool to call.")
+    input: Optional[str] = Field(None, description="Input params for the tool")
+
+
+def _field(step, name):
+    return step.get(name) if isinstance(step, dict) else getattr(step, name, None)
+
+
+def tool_calls(step) -> list:
+    """ToolCalls of a TOOL step (pydantic model or dict), in the given order."""
+    calls = [
+        call if isinstance(call, ToolCall) else ToolCall.model_validate(call)
+        for call in _field(step, "tools") or []
+    ]
+    if not calls and _field(step, "tool"):
+        calls.append(ToolCall(tool=_field(step, "tool"), input=_field(step, "input")))
+    return calls
+
+
+def observe_message(results) -> str:
+    """One OBSERVE message for all results (the single-call shape for one result)."""
+    if len(results) == 1:
+        return json.dumps({"step": "OBSERVE", **results[0]})
+    return json.dumps({"step": "OBSERVE", "results": results})
+
+
+class ToolRunner:
+    def __init__(self, available_tools: dict, max_concurrency: int = 8):
+        self.available_tools = available_tools
+        self.max_concurrency = max_concurrency
+        self._runner = asyncio.Runner()
+
+    async def _call(self, call: ToolCall, semaphore) -> dict:
+        async with semaphore:
+            try:
+                function = self.available_tools[call.tool]
+                if inspect.iscoroutinefunction(function):
+                    output = await function(call.input)
+                else:
+                    output = await asyncio.to_thread(function, call.input)
+            except Exception as e:  # reported to the model like any other output
+                output = f"{type(e).__name__}: {e}"
+        return {"tool": call.tool, "input": call.input, "output": output}
+
+    async def run_async(self, calls) -> list:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.gather(*(self._call(call, semaphore) for call in calls))
+
+    def run(self, calls) -> list:
+        """Run the calls concurrently; results in call order."""
+        return self._runner.run(self.run_async(calls))
+
+    def close(self):
+        self._runner.close()
@@ -0,0 +1,34 @@
+"""
+get_weather tool
+---------------------------------
+Async, on the shared ToolHTTP client; answers are cached for 10 minutes.
+
+WEATHER_BASE_URL points it somewhere else than wttr.in, e.g. the local stub:
+
+    python -m agent.stub_server &
+    WEATHER_BASE_URL=http://127.0.0.1:8765 python 01_weather_agent.py
+"""
+
+import os
+
+import httpx
+
+from agent.tool_http import tool_http
+
+WEATHER_BASE_URL = os.getenv("WEATHER_BASE_URL", "https://wttr.in").rstrip("/")
+WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", "600"))
+
+tool_http.add_cache("weather", ttl=WEATHER_CACHE_TTL)
+
+
+async def get_weather(city: str):
+    url = f"{WEATHER_BASE_URL}/{city.strip().lower()}?format=%C+%t"
+    try:
+        status, text = await tool_http.get(url, cache="weather")
+    except httpx.HTTPError as e:
+        return f"Failed to fetch weather ({type(e).__name__})."
+
+    if status == 200:
+        return f"The weather in {city} is {text}."
+    else:
+        return f"Failed to fetch weather."
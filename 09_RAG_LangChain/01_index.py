@@ -1,10 +1,11 @@
+import os
+import time
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 # from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
-from langchain_community.embeddings import HuggingFaceEmbeddings
-# import os
+from rag.bm25 import DEFAULT_PATH as BM25_PATH
+from rag.chunking import TokenChunker
+from rag.embeddings import EmbeddingService, default_cache
+from rag.indexing import index_pdf
 # import sentence_transformers
 
 # INDEXING
@@ -12,19 +13,13 @@ from langchain_community.embeddings import HuggingFaceEmbeddings
 # pdf_path = "D:\Full-Stack-AI/09_RAG_LangChain/nodejs.pdf"
 pdf_path = Path(__file__).parent / "nodejs.pdf"
 
-loader = PyPDFLoader(file_path=pdf_path)
-docs = loader.load() # page by page loading
+# True  -> wipe the collection and embed everything again (old behaviour)
+# False -> incremental: only new/changed chunks are embedded, removed chunks are deleted
+FULL_REINDEX = False
 
-# print(docs[12]) # read any page
-
-# Split the docs into smaller chunks
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size = 1000,
-    chunk_overlap = 400 
-)
-
-chunks = text_splitter.split_documents(documents=docs)
-# print(chunks[10]) # print out particular chunks
+# None -> float32 vectors; "int8" (4x smaller) or "pq" (16x) -> quantized copy in RAM,
+# float originals on disk for rescoring (07_quantization_benchmark.py compares them)
+QUANTIZATION = os.getenv("RAG_QUANTIZATION") or None
 
 # Vector Embeddings
 # embedding_model = GoogleGenerativeAIEmbeddings(
@@ -33,14 +28,32 @@ chunks = text_splitter.split_documents(documents=docs)
 #     # google_api_key=os.getenv("GOOGLE_API_KEY")
 # )
 
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-vector_store = QdrantVectorStore.from_documents(
-    documents=chunks,
-    embedding=embedding_model,
-    url="http://localhost:6333",
-    collection_name="learning_rag_hf",         # same name will delete stuff
-    force_recreate = True # now create 384-d vectors
-)
-
-print("Indexing of documents done...")
\ No newline at end of file
+if __name__ == "__main__":  # needed because pages are parsed in a process pool
+    # all-MiniLM-L6-v2 on one worker process per core, length-sorted batches
+    # Chunks embedded by an earlier run come from the on-disk cache instead of the model
+    embedding_model = EmbeddingService(workers=os.cpu_count() or 1, cache=default_cache())
+
+    start = time.perf_counter()
+
+    # Chunks of at most 254 MiniLM word-pieces (+ [CLS]/[SEP] = the model's 256 limit)
+    # with 32 tokens of overlap, instead of 1000 characters that the model may truncate
+    text_splitter = TokenChunker.from_embedding_model(chunk_tokens=254, overlap_tokens=32)
+
+    # Pages are parsed in parallel and split into token windows
+    stats = index_pdf(
+        pdf_path,
+        embedding=embedding_model,
+        text_splitter=text_splitter,
+        url="http://localhost:6333",
+        collection_name="learning_rag_hf",
+        recreate=FULL_REINDEX,
+        bm25_path=BM25_PATH,  # keyword index for hybrid search (03/04 retrievers, 10_RAG_Queue)
+        quantization=QUANTIZATION
+    )
+
+    print(f"Indexing of documents done in {time.perf_counter() - start:.1f}s...")
+    print(f"Added: {stats['added']} | Unchanged: {stats['unchanged']} | Deleted: {stats['deleted']}")
+    print(f"Chunks: {text_splitter.stats['chunks']} | Tokens: {text_splitter.stats['tokens']} | Truncated: {text_splitter.stats['truncated']}")
+    print(f"Embedding: {embedding_model.stats}")
+    print(f"Embedding cache: {embedding_model.cache}")
+    embedding_model.close()
@@ -1,8 +1,11 @@
+import os
 from pathlib import Path
 from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from rag.chunking import TokenChunker
+from rag.embeddings import get_embedding_service
 from langchain_qdrant import QdrantVectorStore
+from rag.filters import ensure_payload_indexes
+from rag.quantization import enable_quantization
 
 # 1. PDF path
 pdf_path = Path(__file__).parent / "nodejs.pdf"
@@ -10,16 +13,16 @@ pdf_path = Path(__file__).parent / "nodejs.pdf"
 # 2. Load PDF
 loader = PyPDFLoader(file_path=pdf_path)
 docs = loader.load()  # page by page
+for doc in docs:
+    doc.metadata["source_name"] = pdf_path.name  # source filters match the file name
 
-# 3. Split into chunks
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=400
-)
+# 3. Split into chunks measured in MiniLM tokens (the model reads at most 256 of them)
+text_splitter = TokenChunker.from_embedding_model(chunk_tokens=254, overlap_tokens=32)
 chunks = text_splitter.split_documents(docs)
+print(f"Chunks: {len(chunks)} | Truncated by the embedding model: {text_splitter.stats['truncated']}")
 
 # 4. Embeddings model (Hugging Face)
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+embedding_model = get_embedding_service()  # shared all-MiniLM-L6-v2 service
 
 # 5. Qdrant vector store (recreate collection with correct dim)
 vector_store = QdrantVectorStore.from_documents(
@@ -30,6 +33,13 @@ vector_store = QdrantVectorStore.from_documents(
     force_recreate=True
 )
 
+# Payload indexes: filtered searches (source, page, page_label) don't scan every point
+ensure_payload_indexes(vector_store.client, "learning_rag_hf")
+
+# Optional: RAG_QUANTIZATION=int8 | pq keeps a compressed copy of the vectors for search
+if os.getenv("RAG_QUANTIZATION"):
+    enable_quantization(vector_store.client, "learning_rag_hf", os.getenv("RAG_QUANTIZATION"))
+
 print("✅ Indexing of documents done...")
 
 # 6. Run a similarity search
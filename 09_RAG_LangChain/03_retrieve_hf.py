@@ -1,8 +1,11 @@
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from rag.embeddings import get_embedding_service
 from langchain_qdrant import QdrantVectorStore
+from rag.bm25 import BM25Index
+from rag.hybrid import HybridRetriever
+from rag.filters import MetadataFilter
 
 # 1. Load embedding model
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+embedding_model = get_embedding_service()  # shared all-MiniLM-L6-v2 service
 
 # 2. Connect to existing Qdrant collection
 vector_db = QdrantVectorStore.from_existing_collection(
@@ -11,11 +14,19 @@ vector_db = QdrantVectorStore.from_existing_collection(
     embedding=embedding_model
 )
 
+# Hybrid search (vector + BM25 fused with RRF) when 01_index.py has built the keyword index
+bm25_index = BM25Index.load_if_exists()
+retriever = HybridRetriever(vector_db, bm25_index) if bm25_index else vector_db
+
+# Optional: search only part of the corpus, e.g. MetadataFilter.build(pages=(10, 40))
+# or MetadataFilter.build(source="nodejs.pdf", page_label=["12", "13"])
+search_filter = None
+
 # 3. Take user input
 user_query = input("Ask something: ")
 
-# 4. Perform similarity search
-search_results = vector_db.similarity_search(query=user_query, k=3)
+# 4. Perform similarity search (the filter runs inside Qdrant, on the payload indexes)
+search_results = retriever.similarity_search(query=user_query, k=3, filter=search_filter)
 
 # 5. Show results directly
 print("\n🔎 Top matching chunks:\n")
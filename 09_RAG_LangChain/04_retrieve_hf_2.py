@@ -1,9 +1,16 @@
-from langchain_community.embeddings import HuggingFaceEmbeddings
+import os
+from rag.embeddings import get_embedding_service
 from langchain_qdrant import QdrantVectorStore
-from transformers import pipeline
+from rag.bm25 import BM25Index
+from rag.hybrid import HybridRetriever
+from rag.rerank import Reranker
+from rag.context import ContextPacker, assemble_context
+from rag.generation import GEN_MODEL, RAG_PREAMBLE, get_generation_service
+import httpx
+from transformers import AutoTokenizer
 
 # 1. Load embeddings model
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+embedding_model = get_embedding_service()  # shared all-MiniLM-L6-v2 service
 
 # 2. Connect to existing Qdrant collection
 vector_db = QdrantVectorStore.from_existing_collection(
@@ -12,32 +19,62 @@ vector_db = QdrantVectorStore.from_existing_collection(
     embedding=embedding_model
 )
 
-# 3. Load a HuggingFace text generation model (choose a small one for local use)
-# Example: distilgpt2 (small) OR "mistralai/Mistral-7B-Instruct" if you have GPU
-generator = pipeline("text-generation", model="distilgpt2")
+# Hybrid search (vector + BM25 fused with RRF) when 01_index.py has built the keyword index
+bm25_index = BM25Index.load_if_exists()
+retriever = HybridRetriever(vector_db, bm25_index) if bm25_index else vector_db
+
+# Optional rerank stage: top 50 candidates -> CPU cross-encoder -> top 3
+# (falls back to the retrieval order when scoring would take more than 300 ms)
+USE_RERANKER = True
+reranker = Reranker(budget_ms=300) if USE_RERANKER else None
+
+# 3. Text generation: the long-lived server (06_generation_server.py) keeps distilgpt2 loaded;
+# without it the model is loaded in this process (GenerationService, same batching + prefix cache)
+GENERATION_URL = os.getenv("GENERATION_URL", "http://localhost:8001")
+MAX_NEW_TOKENS = 128
+
+# Context budget in distilgpt2 tokens (only the tokenizer is needed for packing)
+CONTEXT_TOKENS = 320
+packer = ContextPacker(AutoTokenizer.from_pretrained(GEN_MODEL), budget_tokens=CONTEXT_TOKENS)
+
+
+def stream_answer(prompt: str):
+    try:
+        with httpx.stream(
+            "POST", f"{GENERATION_URL}/generate",
+            json={"prompt": prompt, "max_new_tokens": MAX_NEW_TOKENS, "temperature": 0.7},
+            timeout=httpx.Timeout(60, connect=1)
+        ) as response:
+            response.raise_for_status()
+            yield from response.iter_text()
+    except httpx.ConnectError:
+        print("(generation server not running, loading the model locally)")
+        yield from get_generation_service().stream(prompt, max_new_tokens=MAX_NEW_TOKENS, temperature=0.7)
 
 # 4. Take user input
 user_query = input("Ask something: ")
 
-# 5. Retrieve top matching chunks
-search_results = vector_db.similarity_search(query=user_query, k=3)
-
-# 6. Build context
-context = "\n\n".join([res.page_content for res in search_results])
+# 5. Retrieve top matching chunks (a few more than fit: overlaps are merged below)
+if reranker:
+    candidates = retriever.similarity_search_with_score(user_query, k=50)
+    search_results = reranker.rerank(user_query, candidates, k=5)
+else:
+    search_results = retriever.similarity_search_with_score(user_query, k=5)
 
-prompt = f"""
-You are a helpful AI Assistant. Answer the question based only on the provided context.
+# 6. Build context: merge overlapping chunks, drop near-duplicates, pack to CONTEXT_TOKENS
+context, packed = assemble_context(search_results, packer)
+print(f"📦 {len(search_results)} chunks -> {len(packed)} passages, {packer.count(context)} tokens")
 
-Context:
-{context}
+# Starts with RAG_PREAMBLE: the generation service reuses its KV cache
+prompt = f"""{RAG_PREAMBLE}{context}
 
 Question: {user_query}
 
 Answer:
 """
 
-# 7. Generate answer using HuggingFace model
-response = generator(prompt, max_length=512, do_sample=True, temperature=0.7)
-
+# 7. Generate the answer, streamed token by token
 print("\n🤖 Answer:")
-print(response[0]["generated_text"])
+for piece in stream_answer(prompt):
+    print(piece, end="", flush=True)
+print()
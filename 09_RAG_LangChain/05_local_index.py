@@ -0,0 +1,43 @@
+import time
+from pathlib import Path
+from langchain_qdrant import QdrantVectorStore
+from rag.embeddings import get_embedding_service
+from rag.vector_index import LocalVectorIndex, recall_at_k
+
+# Folder the in-process index is written to (loaded by 10_RAG_Queue with RAG_BACKEND=local)
+index_path = Path(__file__).parent / ".cache" / "learning_rag_hf"
+
+# 1. Load embedding model
+embedding_model = get_embedding_service()  # shared all-MiniLM-L6-v2 service
+
+# 2. Connect to existing Qdrant collection
+vector_db = QdrantVectorStore.from_existing_collection(
+    url="http://localhost:6333",   # Qdrant running locally
+    collection_name="learning_rag_hf",
+    embedding=embedding_model
+)
+
+# 3. Export the whole collection (vectors + payloads) into a local index
+local_index = LocalVectorIndex.from_qdrant(vector_db.client, "learning_rag_hf", embedding=embedding_model)
+local_index.save(index_path)
+print(f"✅ Exported {len(local_index)} vectors to {index_path}")
+
+# 4. Check the local index returns the same chunks as Qdrant
+queries = [
+    "What is Node.js event loop?",
+    "How do I read a file?",
+    "What is npm?",
+    "How to create an HTTP server?",
+    "What are streams?",
+]
+local_index = LocalVectorIndex.load(index_path, embedding=embedding_model)
+for k in (1, 3, 10):
+    print(f"🔎 recall@{k} vs Qdrant: {recall_at_k(local_index, vector_db, queries, k=k):.2f}")
+
+# 5. Compare latency (embeddings are cached after step 4, so this is search only)
+for name, store in (("Qdrant", vector_db), ("Local", local_index)):
+    start = time.perf_counter()
+    for _ in range(20):
+        for query in queries:
+            store.similarity_search(query, k=3)
+    print(f"⏱️ {name}: {(time.perf_counter() - start) / (20 * len(queries)) * 1000:.2f} ms/query")
@@ -0,0 +1,55 @@
+"""
+Long-lived generation server: distilgpt2 is loaded once, concurrent prompts are
+batched together and answers are streamed back as plain text.
+
+Run:   python 06_generation_server.py
+Use:   curl -N -X POST localhost:8001/generate -H 'content-type: application/json' \
+            -d '{"prompt": "Hello", "max_new_tokens": 32}'
+"""
+
+import os
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from rag.generation import get_generation_service
+
+GEN_PORT = int(os.getenv("GEN_PORT", 8001))
+
+service = get_generation_service()
+app = FastAPI()
+
+
+class GenerateRequest(BaseModel):
+    prompt: str
+    max_new_tokens: int = Field(128, ge=1, le=512)
+    temperature: float = Field(0.7, ge=0)
+    stream: bool = True
+
+
+@app.on_event("startup")
+def load_model():
+    service.load()  # model + prefix KV cache, before the first request
+
+
+@app.get("/")
+def root():
+    return {"status": "Generation server is up", "model": service.model_name, "stats": service.stats}
+
+
+@app.post("/generate")
+def generate(body: GenerateRequest):
+    try:
+        request = service.submit(body.prompt, max_new_tokens=body.max_new_tokens, temperature=body.temperature)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if body.stream:
+        # Sync iterator: Starlette pulls it from its thread pool, the event loop never blocks
+        return StreamingResponse(request.stream(), media_type="text/plain; charset=utf-8")
+    return {"text": request.result()}
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=GEN_PORT)
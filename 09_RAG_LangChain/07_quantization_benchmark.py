@@ -0,0 +1,147 @@
+"""
+float32 vs int8 vs product quantization, on a running Qdrant.
+
+Reports estimated RAM per million vectors (vector data only, from bytes_per_vector,
+not measured), QPS and recall@10 against exact float search.
+
+    python 07_quantization_benchmark.py                            # vectors of learning_rag_hf (384-d)
+    python 07_quantization_benchmark.py --synthetic 200000 --dim 768   # user_memories sized vectors
+"""
+
+import argparse
+import time
+
+import numpy as np
+import orjson
+from qdrant_client import QdrantClient, models
+
+from rag.quantization import bytes_per_vector, quantization_config, search_params, vectors_config
+from rag.vector_index import LocalVectorIndex
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 256, seed: int = 0):
+    # Clustered, like real embeddings (uniform random vectors make every method look alike)
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_queries(vectors, n: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(len(vectors), n, replace=False)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def create_collection(client, name: str, vectors, kind: str = None, batch_size: int = 1024):
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=vectors_config(vectors.shape[1], quantized=bool(kind)),
+        quantization_config=quantization_config(kind)
+    )
+    for start in range(0, len(vectors), batch_size):
+        block = vectors[start:start + batch_size]
+        client.upsert(
+            collection_name=name,
+            points=models.Batch(ids=list(range(start, start + len(block))), vectors=block.tolist()),
+            wait=False
+        )
+    # Optimizers (HNSW + quantized copy) run in the background
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+
+
+def run_queries(client, name: str, queries, k: int, params=None, batch_size: int = 32):
+    """(result ids per query, queries per second)"""
+    results = []
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        responses = client.query_batch_points(
+            collection_name=name,
+            requests=[
+                models.QueryRequest(query=query.tolist(), limit=k, params=params)
+                for query in queries[i:i + batch_size]
+            ]
+        )
+        results.extend([point.id for point in response.points] for response in responses)
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def recall(expected, got) -> float:
+    found = sum(len(set(e) & set(g)) for e, g in zip(expected, got))
+    return found / sum(len(e) for e in expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qdrant quantization benchmark")
+    parser.add_argument("--url", default="http://localhost:6333")
+    parser.add_argument("--collection", default="learning_rag_hf", help="Take the vectors from this collection")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url)
+
+    # 1. Vectors + queries
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dim)
+    else:
+        vectors = np.asarray(LocalVectorIndex.from_qdrant(client, args.collection).vectors)
+    queries = make_queries(vectors, min(args.queries, len(vectors)))
+    print(f"📦 {len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries")
+
+    # 2. Ground truth: exact float search
+    _, expected_rows = LocalVectorIndex(vectors, range(len(vectors)), [{}] * len(vectors)).search(queries, args.k)
+    expected = [list(map(int, rows)) for rows in expected_rows]
+
+    # 3. One collection per configuration
+    configs = [
+        ("float32", None, None),
+        ("int8", "int8", search_params(args.oversampling)),
+        ("int8 (no rescore)", "int8", search_params(1.0, rescore=False)),
+        ("pq x16", "pq", search_params(args.oversampling)),
+        ("pq x16 (no rescore)", "pq", search_params(1.0, rescore=False)),
+    ]
+    results = []
+    built = set()
+    for label, kind, params in configs:
+        name = f"bench_quantization_{kind or 'float'}"
+        if name not in built:
+            start = time.perf_counter()
+            create_collection(client, name, vectors, kind)
+            print(f"🏗️ {name} built in {time.perf_counter() - start:.1f}s")
+            built.add(name)
+
+        run_queries(client, name, queries[:32], args.k, params)  # warm up
+        got, qps = run_queries(client, name, queries, args.k, params)
+        results.append({
+            "config": label,
+            "est_mib_per_million": bytes_per_vector(vectors.shape[1], kind) * 1_000_000 / 2 ** 20,
+            "qps": qps,
+            f"recall@{args.k}": recall(expected, got),
+        })
+
+    for name in built:
+        client.delete_collection(name)
+
+    # 4. Report
+    print(f"\n{'config':<22}{'est. MiB / 1M (vectors only)':>30}{'QPS':>10}{f'recall@{args.k}':>12}")
+    for row in results:
+        print(f"{row['config']:<22}{row['est_mib_per_million']:>30.0f}{row['qps']:>10.0f}{row[f'recall@{args.k}']:>12.3f}")
+
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(orjson.dumps({
+                "vectors": len(vectors), "dim": vectors.shape[1], "queries": len(queries), "results": results
+            }, option=orjson.OPT_INDENT_2))
+
+
+if __name__ == "__main__":
+    main()
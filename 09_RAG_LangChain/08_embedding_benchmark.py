@@ -0,0 +1,81 @@
+"""
+Embedding throughput vs number of workers.
+
+Embeds the same chunks of nodejs.pdf with 1, 2, 4, ... EmbeddingService workers, in
+calls of preferred_batch_size texts like index_pdf makes them, and reports texts/sec.
+
+    python 08_embedding_benchmark.py                        # 1, 2, 4, ... cpu_count processes
+    python 08_embedding_benchmark.py --workers 1 4 8 --mode thread --output embed.json
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+import orjson
+
+from rag.chunking import TokenChunker
+from rag.embeddings import EmbeddingService, EmbeddingStats
+from rag.indexing import batched, iter_chunks, iter_pages
+
+
+def default_workers():
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 < cores:
+        counts.append(counts[-1] * 2)
+    return counts + [cores] if cores > 1 else counts
+
+
+def load_texts(pdf_path, n: int):
+    text_splitter = TokenChunker.from_embedding_model(chunk_tokens=254, overlap_tokens=32)
+    chunks = iter_chunks(iter_pages(pdf_path, workers=0), text_splitter)
+    return [chunk.page_content for chunk, _ in zip(chunks, range(n))]
+
+
+def run(texts, workers: int, mode: str, batch_size: int) -> EmbeddingStats:
+    with EmbeddingService(workers=workers, mode=mode, batch_size=batch_size) as service:
+        service.embed(texts[:service.preferred_batch_size])  # warm up: every worker loads its model
+        service.stats = EmbeddingStats()
+        for batch in batched(texts, service.preferred_batch_size):
+            service.embed(batch)
+        return service.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EmbeddingService scaling benchmark")
+    parser.add_argument("--pdf", default=str(Path(__file__).parent / "nodejs.pdf"))
+    parser.add_argument("--texts", type=int, default=2048)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers())
+    parser.add_argument("--mode", choices=("process", "thread"), default="process")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    texts = load_texts(args.pdf, args.texts)
+    print(f"📦 {len(texts)} chunks, {os.cpu_count()} cores, {args.mode} workers")
+
+    results = []
+    for workers in args.workers:
+        stats = run(texts, workers, args.mode, args.batch_size)
+        results.append({
+            "workers": workers,
+            "texts_per_sec": stats.texts_per_sec,
+            "tokens_per_sec": stats.tokens_per_sec,
+            "speedup": stats.texts_per_sec / results[0]["texts_per_sec"] if results else 1.0,
+        })
+        print(f"⏱️ {workers} workers: {stats}")
+
+    print(f"\n{'workers':>8}{'texts/s':>12}{'tokens/s':>12}{'speedup':>10}")
+    for row in results:
+        print(f"{row['workers']:>8}{row['texts_per_sec']:>12.1f}{row['tokens_per_sec']:>12.0f}{row['speedup']:>9.2f}x")
+
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(orjson.dumps({
+                "texts": len(texts), "cores": os.cpu_count(), "mode": args.mode, "results": results
+            }, option=orjson.OPT_INDENT_2))
+
+
+if __name__ == "__main__":
+    main()
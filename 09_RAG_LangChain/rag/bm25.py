@@ -0,0 +1,140 @@
+"""
+BM25 keyword index
+---------------------------------
+rank-bm25 scores a query with a Python loop over every document. Here the BM25
+weight of every (chunk, term) pair is computed once at indexing time and kept in
+a sparse CSC matrix, so a query is just "sum the columns of the query terms".
+
+Chunks are added one at a time (BM25Builder.add), so it can be fed while streaming.
+Their metadata (source, page, ...) is kept too, so searches can take a MetadataFilter.
+"""
+
+import re
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import orjson
+from scipy import sparse
+
+from .filters import MaskCache
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / ".cache" / "learning_rag_hf_bm25"
+
+# Keeps code-ish tokens together: fs.readfile, child_process, es-modules, v18.0
+TOKEN_RE = re.compile(r"[a-z0-9_]+(?:[.\-][a-z0-9_]+)*")
+PART_RE = re.compile(r"[.\-]")
+
+
+def tokenize(text: str):
+    """Compound tokens plus their ./- parts: "fs.readfile" -> fs.readfile, fs, readfile."""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        if PART_RE.search(token):
+            tokens.extend(part for part in PART_RE.split(token) if part)
+    return tokens
+
+
+class BM25Builder:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.metadata = []
+        self.vocab = {}
+        # Only term counts are kept, never the chunk text
+        self._rows, self._cols, self._tfs = [], [], []
+        self._lengths = []
+
+    def add(self, chunk_id: str, text: str, metadata: dict = None):
+        row = len(self.ids)
+        self.ids.append(chunk_id)
+        self.metadata.append(metadata or {})
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self._rows.append(row)
+            self._cols.append(self.vocab.setdefault(term, len(self.vocab)))
+            self._tfs.append(tf)
+        self._lengths.append(sum(counts.values()))
+
+    def build(self):
+        n_docs, n_terms = len(self.ids), len(self.vocab)
+        rows = np.asarray(self._rows, dtype=np.int64)
+        cols = np.asarray(self._cols, dtype=np.int64)
+        tfs = np.asarray(self._tfs, dtype=np.float32)
+        lengths = np.asarray(self._lengths, dtype=np.float32)
+
+        # Lucene style idf (never negative)
+        df = np.bincount(cols, minlength=n_terms).astype(np.float32)
+        idf = np.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+
+        avg_length = lengths.mean() if n_docs else 0.0
+        norm = self.k1 * (1 - self.b + self.b * lengths[rows] / max(avg_length, 1e-9))
+        weights = idf[cols] * tfs * (self.k1 + 1) / (tfs + norm)
+
+        matrix = sparse.csc_matrix((weights, (rows, cols)), shape=(n_docs, n_terms), dtype=np.float32)
+        return BM25Index(matrix, self.vocab, self.ids, self.metadata)
+
+
+class BM25Index:
+    def __init__(self, matrix, vocab, ids, metadata=None):
+        self.matrix = matrix.tocsc()
+        self.vocab = vocab
+        self.ids = list(ids)
+        self.metadata = metadata  # None for indexes saved before metadata was stored
+        self._masks = MaskCache()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids, texts, metadatas=None, **kwargs):
+        builder = BM25Builder(**kwargs)
+        for i, (chunk_id, text) in enumerate(zip(ids, texts)):
+            builder.add(chunk_id, text, metadatas[i] if metadatas else None)
+        return builder.build()
+
+    def term_ids(self, query: str):
+        return [self.vocab[term] for term in set(tokenize(query)) if term in self.vocab]
+
+    def search(self, query: str, k: int = 10, filter=None):
+        """Return [(chunk id, score)] best first; only chunks containing a query term score.
+
+        With a MetadataFilter only the matching chunks score (none if the index has no metadata).
+        """
+        term_ids = self.term_ids(query)
+        if not term_ids or (filter and self.metadata is None):
+            return []
+
+        scores = np.asarray(self.matrix[:, term_ids].sum(axis=1)).ravel()
+        if filter:
+            scores[~self._masks.get(filter, self.metadata)] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [(self.ids[row], float(scores[row])) for row in candidates]
+
+    def document_frequency(self, term: str) -> int:
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            return 0
+        return int(self.matrix.indptr[term_id + 1] - self.matrix.indptr[term_id])
+
+    def save(self, path=DEFAULT_PATH):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        sparse.save_npz(path / "bm25.npz", self.matrix)
+        (path / "bm25.json").write_bytes(orjson.dumps({"vocab": self.vocab, "ids": self.ids, "metadata": self.metadata}))
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        path = Path(path)
+        meta = orjson.loads((path / "bm25.json").read_bytes())
+        return cls(sparse.load_npz(path / "bm25.npz"), meta["vocab"], meta["ids"], meta.get("metadata"))
+
+    @classmethod
+    def load_if_exists(cls, path=DEFAULT_PATH):
+        return cls.load(path) if (Path(path) / "bm25.npz").exists() else None
+
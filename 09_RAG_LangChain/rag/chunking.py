@@ -0,0 +1,122 @@
+"""
+Token-aware chunking
+---------------------------------
+RecursiveCharacterTextSplitter counts characters, but all-MiniLM-L6-v2 only reads
+the first 256 word-pieces of a chunk: long chunks get silently truncated while
+short ones waste vectors. TokenChunker cuts windows of N real tokens instead.
+
+Pages are tokenized in batches with offsets (one fast-tokenizer call for many
+pages, not one call per candidate split), windows are cut on token boundaries
+and mapped back to the original text through the character offsets.
+"""
+
+from langchain_core.documents import Document
+
+from .embeddings import MODEL_NAME
+
+MINILM_MAX_TOKENS = 256  # max_seq_length of all-MiniLM-L6-v2
+SPECIAL_TOKENS = 2       # [CLS] and [SEP], added by the model's tokenizer
+
+
+def is_truncated(n_tokens: int, max_tokens: int = MINILM_MAX_TOKENS) -> bool:
+    """Would a text of n_tokens (without special tokens) be cut by a model reading max_tokens?"""
+    return n_tokens + SPECIAL_TOKENS > max_tokens
+
+
+class HFTokenizer:
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    def offsets(self, texts):
+        encoded = self.tokenizer(list(texts), add_special_tokens=False, return_offsets_mapping=True)
+        return encoded["offset_mapping"]
+
+
+class TiktokenTokenizer:
+    def __init__(self, encoding):
+        self.encoding = encoding
+
+    def offsets(self, texts):
+        spans = []
+        for text, ids in zip(texts, self.encoding.encode_batch(list(texts))):
+            _, starts = self.encoding.decode_with_offsets(ids)
+            ends = starts[1:] + [len(text)]
+            spans.append(list(zip(starts, ends)))
+        return spans
+
+
+class TokenChunker:
+    def __init__(
+            self,
+            tokenizer,
+            chunk_tokens: int = MINILM_MAX_TOKENS - SPECIAL_TOKENS,
+            overlap_tokens: int = 32,
+            max_tokens: int = MINILM_MAX_TOKENS,
+            batch_size: int = 32
+    ):
+        self.tokenizer = tokenizer
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.max_tokens = max_tokens
+        self.batch_size = batch_size
+        self.stats = {"chunks": 0, "tokens": 0, "truncated": 0}
+
+    @classmethod
+    def from_embedding_model(cls, model_name: str = MODEL_NAME, **kwargs):
+        """Lengths measured with the embedding model's own (fast) tokenizer."""
+        from transformers import AutoTokenizer
+        return cls(HFTokenizer(AutoTokenizer.from_pretrained(model_name, use_fast=True)), **kwargs)
+
+    @classmethod
+    def from_tiktoken(cls, model: str = "gpt-4o", **kwargs):
+        """Lengths measured in LLM tokens (e.g. to budget the prompt context)."""
+        import tiktoken
+        return cls(TiktokenTokenizer(tiktoken.encoding_for_model(model)), **kwargs)
+
+    def _windows(self, spans):
+        """(first token, end token) windows; ends are moved back to a word boundary when possible."""
+        n = len(spans)
+        start = 0
+        while start < n:
+            end = min(start + self.chunk_tokens, n)
+            if end < n:
+                # Token `end` glued to the previous one (no whitespace) -> we'd cut a word
+                cut = end
+                while cut > start + self.chunk_tokens // 2 and spans[cut][0] == spans[cut - 1][1]:
+                    cut -= 1
+                if spans[cut][0] != spans[cut - 1][1]:
+                    end = cut
+            yield start, end
+            if end == n:
+                return
+            start = max(end - self.overlap_tokens, start + 1)
+
+    def split_text_spans(self, text: str, spans):
+        for start, end in self._windows(spans):
+            char_start, char_end = spans[start][0], spans[end - 1][1]
+            yield text[char_start:char_end], char_start, end - start
+
+    def split_documents(self, documents):
+        documents = list(documents)
+        chunks = []
+        for i in range(0, len(documents), self.batch_size):
+            batch = documents[i:i + self.batch_size]
+            # One batched tokenizer call for the whole group of pages
+            all_spans = self.tokenizer.offsets([doc.page_content for doc in batch])
+            for doc, spans in zip(batch, all_spans):
+                for text, char_start, n_tokens in self.split_text_spans(doc.page_content, spans):
+                    if not text.strip():
+                        continue
+                    self.stats["chunks"] += 1
+                    self.stats["tokens"] += n_tokens
+                    self.stats["truncated"] += is_truncated(n_tokens, self.max_tokens)
+                    chunks.append(Document(
+                        page_content=text,
+                        metadata={**doc.metadata, "start_index": char_start}
+                    ))
+        return chunks
+
+
+def count_truncated(texts, tokenizer, max_tokens: int = MINILM_MAX_TOKENS):
+    """How many texts a model reading max_tokens would truncate (e.g. chunks of a character splitter)."""
+    return sum(is_truncated(len(spans), max_tokens) for spans in tokenizer.offsets(texts))
@@ -0,0 +1,221 @@
+"""
+Context assembly
+---------------------------------
+With overlapping chunks (chunk_overlap=400, or 32 tokens with TokenChunker) the
+top-k results often repeat the same sentences, and "\\n\\n".join(...) sends every
+copy to the LLM. Before building the prompt:
+
+- merge_hits: chunks of the same source + page that overlap or touch (by their
+  start_index) are stitched into one passage, the overlap is kept only once
+- dedupe_hits: near-duplicate passages (same text on another page, repeated
+  headers, ...) are dropped by the Jaccard similarity of their word shingles:
+  exact for a retrieval's top-k, MinHash (numpy) for long lists
+- ContextPacker: passages are added best first until an exact token budget is
+  reached; the last one is cut on a token boundary
+
+Hits are [(Document, score)] best first, like the retrievers and Reranker return.
+"""
+
+import hashlib
+import re
+import zlib
+
+import numpy as np
+from langchain_core.documents import Document
+
+WORD_RE = re.compile(r"\w+")
+
+# Up to this many hits, comparing the shingle sets exactly is cheaper than MinHash signatures
+EXACT_MAX_HITS = 32
+
+# MinHash: h_i(x) = (a_i * x + b_i) >> 32 in uint64 (multiply-shift, a_i odd),
+# with fixed (a_i, b_i) so signatures are stable
+NUM_PERM = 64
+
+
+def _permutations(num_perm: int):
+    a, b = [], []
+    for i in range(num_perm):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a.append(int.from_bytes(digest[:8], "little") | 1)
+        b.append(int.from_bytes(digest[8:], "little"))
+    return np.array(a, dtype=np.uint64), np.array(b, dtype=np.uint64)
+
+
+_A, _B = _permutations(NUM_PERM)
+
+
+# ---------------------------
+# 🧩 MERGE OVERLAPPING CHUNKS
+# ---------------------------
+
+def _span(doc: Document):
+    start = doc.metadata.get("start_index")
+    if start is None:
+        return None
+    return start, start + len(doc.page_content)
+
+
+def merge_hits(hits, max_gap: int = 1):
+    """Stitch chunks of the same (source, page) that overlap or are at most max_gap chars apart.
+
+    A merged passage keeps the metadata of its best ranked chunk, the best score and
+    the ids of all its chunks in metadata["_merged_ids"]; it takes the rank of its best chunk.
+    Chunks without start_index are left alone.
+    """
+    hits = list(hits)
+    groups = {}
+    for rank, (doc, score) in enumerate(hits):
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        if _span(doc) is not None:
+            groups.setdefault(key, []).append(rank)
+
+    merged = {}   # rank of the best chunk -> merged hit
+    absorbed = set()
+    for ranks in groups.values():
+        ranks.sort(key=lambda r: _span(hits[r][0])[0])
+        passage = [ranks[0]]
+        for rank in ranks[1:] + [None]:
+            if rank is not None:
+                end = max(_span(hits[r][0])[1] for r in passage)
+                if _span(hits[rank][0])[0] <= end + max_gap:
+                    passage.append(rank)
+                    continue
+            if len(passage) > 1:
+                best = min(passage)
+                merged[best] = _stitch([hits[r] for r in passage], hits[best])
+                absorbed.update(r for r in passage if r != best)
+            passage = [rank]
+
+    return [merged.get(rank, hit) for rank, hit in enumerate(hits) if rank not in absorbed]
+
+
+def _stitch(passage, best_hit):
+    # passage is sorted by start_index
+    text, end = "", None
+    for doc, _ in passage:
+        start, stop = _span(doc)
+        if end is None:
+            text, end = doc.page_content, stop
+        elif stop > end:
+            tail = doc.page_content[max(end - start, 0):]
+            text += (" " if start > end else "") + tail
+            end = stop
+        # a chunk fully inside the passage adds nothing
+
+    best_doc, _ = best_hit
+    metadata = {
+        **best_doc.metadata,
+        "start_index": _span(passage[0][0])[0],
+        "_merged_ids": [doc.metadata.get("_id") for doc, _ in passage],
+    }
+    return Document(page_content=text, metadata=metadata), max(score for _, score in passage)
+
+
+# ---------------------------
+# 🔁 NEAR-DUPLICATES (shingle Jaccard / MinHash)
+# ---------------------------
+
+def shingles(text: str, size: int = 5):
+    words = WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+def jaccard(shingles_a, shingles_b) -> float:
+    """Exact Jaccard similarity of two shingle sets."""
+    return len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+
+
+def minhash(text: str, size: int = 5):
+    """NUM_PERM uint32 values; all shingles x all permutations in one broadcast."""
+    hashes = np.fromiter(shingles(text, size), dtype=np.uint64)
+    return ((hashes[:, None] * _A + _B) >> np.uint64(32)).min(axis=0)  # uint64 products wrap
+
+
+def similarity(signature_a, signature_b) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return np.count_nonzero(signature_a == signature_b) / len(signature_a)
+
+
+def dedupe_hits(hits, threshold: float = 0.8):
+    """Drop hits whose text is a near-duplicate of a better ranked hit.
+
+    A top-k of at most EXACT_MAX_HITS is compared pairwise with exact Jaccard; longer
+    lists use MinHash signatures.
+    """
+    hits = list(hits)
+    sketch, compare = (shingles, jaccard) if len(hits) <= EXACT_MAX_HITS else (minhash, similarity)
+    kept, sketches = [], []
+    for doc, score in hits:
+        current = sketch(doc.page_content)
+        if any(compare(current, other) >= threshold for other in sketches):
+            continue
+        kept.append((doc, score))
+        sketches.append(current)
+    return kept
+
+
+# ---------------------------
+# 📦 TOKEN BUDGET
+# ---------------------------
+
+class ContextPacker:
+    """Pack passages into at most budget_tokens tokens of the LLM's tokenizer.
+
+    tokenizer: anything with encode(text) -> ids and decode(ids) -> text
+    (a Hugging Face tokenizer, or a tiktoken encoding).
+    """
+
+    def __init__(self, tokenizer, budget_tokens: int, separator: str = "\n\n", min_tail_tokens: int = 32):
+        self.tokenizer = tokenizer
+        self.budget_tokens = budget_tokens
+        self.separator = separator
+        self.min_tail_tokens = min_tail_tokens  # don't add a truncated passage shorter than this
+        self.stats = {"passages": 0, "tokens": 0, "truncated": 0}
+
+    def _encode(self, text: str):
+        return list(self.tokenizer.encode(text))
+
+    def count(self, text: str) -> int:
+        return len(self._encode(text))
+
+    def pack(self, hits):
+        """Return (context text, the hits that made it in, truncated last one included)."""
+        separator_tokens = self.count(self.separator)
+        parts, packed, used = [], [], 0
+        for doc, score in hits:
+            ids = self._encode(doc.page_content)
+            remaining = self.budget_tokens - used - (separator_tokens if parts else 0)
+            if remaining <= 0:
+                break
+            if len(ids) > remaining:
+                if remaining < self.min_tail_tokens:
+                    break
+                parts.append(self.tokenizer.decode(ids[:remaining]))
+                packed.append((doc, score))
+                self.stats["truncated"] += 1
+                break
+            parts.append(doc.page_content)
+            packed.append((doc, score))
+            used += len(ids) + (separator_tokens if len(parts) > 1 else 0)
+
+        context = self.separator.join(parts)
+        # Tokens are not always additive across a join (BPE merges); trim to stay exact
+        ids = self._encode(context)
+        if len(ids) > self.budget_tokens:
+            ids = ids[:self.budget_tokens]
+            context = self.tokenizer.decode(ids)
+
+        self.stats["passages"] += len(packed)
+        self.stats["tokens"] += len(ids)
+        return context, packed
+
+
+def assemble_context(hits, packer: ContextPacker = None, dedupe_threshold: float = 0.8):
+    """merge -> dedupe -> pack. Without a packer the passages are just joined."""
+    hits = dedupe_hits(merge_hits(hits), dedupe_threshold)
+    if packer is None:
+        return "\n\n".join(doc.page_content for doc, _ in hits), hits
+    return packer.pack(hits)
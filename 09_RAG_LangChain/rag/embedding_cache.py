@@ -0,0 +1,115 @@
+"""
+Persistent embedding cache
+---------------------------------
+SQLite file: key = sha256(model name + normalized text), value = float32 vector bytes.
+Least recently used rows are evicted once the cache grows past max_entries.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / ".cache" / "embeddings.sqlite"
+
+# SQLite limits the number of "?" parameters per statement
+_SQL_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_key(model_name: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, path=DEFAULT_PATH, max_entries: int = 200_000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._size = 0
+
+    def _connection(self):
+        # A SQLite connection must not be shared across fork(): reconnect in child processes
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key BLOB PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._pid = os.getpid()
+        return self._conn
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get_many(self, model_name: str, texts):
+        """Return one vector (or None on a miss) per text."""
+        keys = [make_key(model_name, text) for text in texts]
+        found = {}
+        now = time.time()
+
+        with self._lock:
+            conn = self._connection()
+            for i in range(0, len(keys), _SQL_BATCH):
+                batch = keys[i:i + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch).fetchall()
+                found.update(rows)
+                if rows:
+                    conn.execute(f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})", [now, *batch])
+
+            vectors = [np.frombuffer(found[key], dtype=np.float32) if key in found else None for key in keys]
+            hits = sum(vector is not None for vector in vectors)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return vectors
+
+    def put_many(self, model_name: str, texts, vectors):
+        now = time.time()
+        rows = [
+            (make_key(model_name, text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+
+        with self._lock:
+            conn = self._connection()
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows)
+            self._size += conn.total_changes - before
+
+            if self._size > self.max_entries:
+                # Evict a little extra so we don't run a DELETE on every insert
+                evict = self._size - int(self.max_entries * 0.9)
+                conn.execute("""
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_used LIMIT ?
+                    )
+                """, (evict,))
+                self._size = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def __str__(self):
+        return f"{self.hits} hits / {self.misses} misses ({self.hit_rate:.0%} hit rate, {self._size} entries)"
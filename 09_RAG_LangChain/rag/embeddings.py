@@ -0,0 +1,240 @@
+"""
+Shared embedding service
+---------------------------------
+Drop-in replacement for HuggingFaceEmbeddings(all-MiniLM-L6-v2):
+- texts are sorted by length and cut into batches, so a batch pads to similar lengths
+- batches run on a pool of worker processes (or threads), each with its own torch threads
+- texts/sec and tokens/sec counters for every call
+- optional persistent cache (rag/embedding_cache.py): cached texts never reach the model
+
+Configured with env vars when created through get_embedding_service():
+EMBED_MODEL, EMBED_WORKERS, EMBED_MODE (process | thread), EMBED_BATCH_SIZE,
+EMBED_CACHE_PATH (empty string disables the cache), EMBED_CACHE_SIZE
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .embedding_cache import DEFAULT_PATH, EmbeddingCache
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+# ---------------------------
+# 🧮 ENCODING
+# ---------------------------
+
+def load_model(model_name: str, torch_threads: int):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(torch_threads)
+    return SentenceTransformer(model_name, device="cpu")
+
+
+def encode_batch(model, texts):
+    """Returns (float32 vectors, number of real (non padding) tokens)."""
+    import torch
+
+    # Tokenize once: the attention mask gives the token count for free
+    features = model.tokenize(texts)
+    tokens = int(features["attention_mask"].sum())
+    features = {key: value.to(model.device) for key, value in features.items()}
+    with torch.inference_mode():
+        vectors = model(features)["sentence_embedding"]
+    return vectors.float().cpu().numpy(), tokens
+
+
+# Every worker process keeps its own copy of the model
+_worker_model = None
+
+
+def _init_worker(model_name: str, torch_threads: int):
+    global _worker_model
+    _worker_model = load_model(model_name, torch_threads)
+
+
+def _encode_in_worker(texts):
+    return encode_batch(_worker_model, texts)
+
+
+# ---------------------------
+# 📊 THROUGHPUT COUNTERS
+# ---------------------------
+
+@dataclass
+class EmbeddingStats:
+    texts: int = 0
+    tokens: int = 0
+    seconds: float = 0.0
+
+    @property
+    def texts_per_sec(self):
+        return self.texts / self.seconds if self.seconds else 0.0
+
+    @property
+    def tokens_per_sec(self):
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.texts} texts, {self.tokens} tokens in {self.seconds:.2f}s "
+                f"({self.texts_per_sec:.1f} texts/s, {self.tokens_per_sec:.0f} tokens/s)")
+
+
+# ---------------------------
+# 🚀 SERVICE
+# ---------------------------
+
+class EmbeddingService(Embeddings):
+    def __init__(
+            self,
+            model_name: str = MODEL_NAME,
+            workers: int = 1,
+            mode: str = "process",
+            batch_size: int = 32,
+            cache: EmbeddingCache = None
+    ):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unknown embedding mode: {mode}")
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.batch_size = batch_size
+        self.cache = cache
+        self.stats = EmbeddingStats()
+
+        # Split the cores between workers instead of letting every worker use all of them
+        self.torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+
+        self._model = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def preferred_batch_size(self) -> int:
+        """Texts per embed() call that give every worker one full batch."""
+        return self.batch_size * self.workers
+
+    # Model and pool are created on first use, so a process that never embeds never loads them
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = load_model(self.model_name, self.torch_threads)
+            return self._model
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                if self.mode == "process":
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        initializer=_init_worker,
+                        initargs=(self.model_name, self.torch_threads)
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _run_batches(self, batches):
+        if self.workers == 1:
+            model = self.model
+            return [encode_batch(model, batch) for batch in batches]
+        if self.mode == "thread":
+            model = self.model
+            return list(self._get_pool().map(lambda batch: encode_batch(model, batch), batches))
+        return list(self._get_pool().map(_encode_in_worker, batches))
+
+    def embed(self, texts) -> np.ndarray:
+        """Embed texts and return a float32 matrix in the original order."""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self.cache is None:
+            return self._compute(texts)
+
+        vectors = self.cache.get_many(self.model_name, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Only cache misses are sent to the model (which stays unloaded on a fully warm cache)
+            missing_texts = [texts[i] for i in missing]
+            computed = self._compute(missing_texts)
+            self.cache.put_many(self.model_name, missing_texts, computed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+        return np.vstack(vectors)
+
+    def _compute(self, texts) -> np.ndarray:
+        start = time.perf_counter()
+
+        # Length-sorted batches: similar lengths -> little padding per batch
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        # At least one batch per worker: a call smaller than preferred_batch_size still uses them all
+        size = max(1, min(self.batch_size, -(-len(texts) // self.workers)))
+        batch_ids = [order[i:i + size] for i in range(0, len(order), size)]
+        results = self._run_batches([[texts[i] for i in ids] for ids in batch_ids])
+
+        dim = results[0][0].shape[1]
+        vectors = np.empty((len(texts), dim), dtype=np.float32)
+        tokens = 0
+        for ids, (batch_vectors, batch_tokens) in zip(batch_ids, results):
+            vectors[ids] = batch_vectors
+            tokens += batch_tokens
+
+        with self._lock:
+            self.stats.texts += len(texts)
+            self.stats.tokens += tokens
+            self.stats.seconds += time.perf_counter() - start
+        return vectors
+
+    def warm_up(self):
+        """Load the model and run one forward pass (first-call kernel setup), skipping cache and stats."""
+        encode_batch(self.model, ["warm up"])
+
+    # LangChain Embeddings interface
+    def embed_documents(self, texts):
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed([text])[0].tolist()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def default_cache():
+    path = os.getenv("EMBED_CACHE_PATH", str(DEFAULT_PATH))
+    if not path:
+        return None
+    return EmbeddingCache(path, max_entries=int(os.getenv("EMBED_CACHE_SIZE", 200_000)))
+
+
+_default_service = None
+
+
+def get_embedding_service() -> EmbeddingService:
+    """One shared service per process, configured from the environment."""
+    global _default_service
+    if _default_service is None:
+        _default_service = EmbeddingService(
+            model_name=os.getenv("EMBED_MODEL", MODEL_NAME),
+            workers=int(os.getenv("EMBED_WORKERS", 1)),
+            mode=os.getenv("EMBED_MODE", "process"),
+            batch_size=int(os.getenv("EMBED_BATCH_SIZE", 32)),
+            cache=default_cache()
+        )
+    return _default_service
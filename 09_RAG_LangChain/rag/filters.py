@@ -0,0 +1,129 @@
+"""
+Metadata filters
+---------------------------------
+One filter object for every store: restrict a search to some source files, a
+page range and/or exact metadata values.
+
+- Qdrant: to_qdrant() becomes the query filter, evaluated inside Qdrant on the
+  payload indexes created at indexing time (ensure_payload_indexes)
+- LocalVectorIndex / BM25Index: mask() marks the matching rows once (cached per
+  filter), the search only scores those rows
+
+Chunks keep the metadata PyPDFLoader writes: source, page (0-based), page_label, ...
+plus source_name, the file name of source, which is what source filters match:
+source holds the path the PDF was indexed from, source="nodejs.pdf" should not
+depend on it.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import PurePath
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+# Payload fields used by the filters (and by the per-source scroll of the incremental indexer)
+PAYLOAD_INDEXES = {
+    "metadata.source": models.PayloadSchemaType.KEYWORD,
+    "metadata.source_name": models.PayloadSchemaType.KEYWORD,
+    "metadata.page": models.PayloadSchemaType.INTEGER,
+    "metadata.page_label": models.PayloadSchemaType.KEYWORD,
+}
+
+
+def source_name(source) -> str:
+    """File name of a chunk's source path ("/data/nodejs.pdf" -> "nodejs.pdf")."""
+    return PurePath(str(source)).name
+
+
+def _as_tuple(value):
+    if value is None:
+        return None
+    return tuple(value) if isinstance(value, (list, tuple, set)) else (value,)
+
+
+@dataclass(frozen=True)
+class MetadataFilter:
+    sources: tuple = None       # match any of these source file names
+    pages: tuple = None         # (first, last) 0-based page numbers, inclusive; None = open end
+    metadata: tuple = field(default=())  # ((key, (allowed values...)), ...)
+
+    @classmethod
+    def build(cls, source=None, pages=None, **metadata):
+        """MetadataFilter.build(source="nodejs.pdf", pages=(10, 20), page_label=["iv", "v"])"""
+        return cls(
+            # Full paths are accepted too, only the file name is compared
+            sources=tuple(source_name(s) for s in _as_tuple(source)) if source is not None else None,
+            pages=tuple(pages) if pages is not None else None,
+            metadata=tuple(sorted((key, _as_tuple(value)) for key, value in metadata.items())),
+        )
+
+    def __bool__(self):
+        return bool(self.sources or self.pages or self.metadata)
+
+    def matches(self, metadata: dict) -> bool:
+        if self.sources is not None:
+            # Indexes saved before source_name existed: derive it from source
+            name = metadata.get("source_name") or source_name(metadata.get("source", ""))
+            if name not in self.sources:
+                return False
+        if self.pages is not None:
+            page = metadata.get("page")
+            first, last = self.pages
+            if page is None or (first is not None and page < first) or (last is not None and page > last):
+                return False
+        return all(metadata.get(key) in values for key, values in self.metadata)
+
+    def mask(self, metadatas) -> np.ndarray:
+        return np.fromiter((self.matches(metadata or {}) for metadata in metadatas), dtype=bool)
+
+    def to_qdrant(self) -> models.Filter:
+        must = []
+        if self.sources is not None:
+            must.append(_match("metadata.source_name", self.sources))
+        if self.pages is not None:
+            first, last = self.pages
+            must.append(models.FieldCondition(key="metadata.page", range=models.Range(gte=first, lte=last)))
+        for key, values in self.metadata:
+            must.append(_match(f"metadata.{key}", values))
+        return models.Filter(must=must)
+
+
+def _match(key: str, values):
+    if len(values) == 1:
+        return models.FieldCondition(key=key, match=models.MatchValue(value=values[0]))
+    return models.FieldCondition(key=key, match=models.MatchAny(any=list(values)))
+
+
+class MaskCache:
+    """Row masks of the last few filters (building one is a pass over all metadata)."""
+
+    def __init__(self, size: int = 32):
+        self.size = size
+        self._masks = {}
+
+    def get(self, flt: MetadataFilter, metadatas) -> np.ndarray:
+        mask = self._masks.pop(flt, None)
+        if mask is None:
+            mask = flt.mask(metadatas)
+        self._masks[flt] = mask  # most recent last
+        if len(self._masks) > self.size:
+            self._masks.pop(next(iter(self._masks)))
+        return mask
+
+
+def store_filter(vector_db, flt: MetadataFilter):
+    """The filter in the form the store's similarity_search(filter=...) expects."""
+    if not flt:
+        return None
+    if hasattr(vector_db, "client"):  # QdrantVectorStore
+        return flt.to_qdrant()
+    return flt
+
+
+def ensure_payload_indexes(client: QdrantClient, collection_name: str, fields=None):
+    """Create the missing payload indexes (existing ones are left alone)."""
+    fields = fields or PAYLOAD_INDEXES
+    existing = client.get_collection(collection_name).payload_schema or {}
+    for field_name, schema in fields.items():
+        if field_name not in existing:
+            client.create_payload_index(collection_name=collection_name, field_name=field_name, field_schema=schema)
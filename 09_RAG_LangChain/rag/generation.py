@@ -0,0 +1,290 @@
+"""
+Local text generation service
+---------------------------------
+pipeline("text-generation", model="distilgpt2") reloads the model in every
+process and generates one prompt at a time. GenerationService loads the model
+once and keeps it:
+
+- requests go through a queue; a background thread collects the ones arriving
+  within `window_ms` of each other (up to `max_batch`) and decodes them together
+- tokens are streamed: every request has its own queue of text pieces
+- the fixed preamble of the RAG prompt is run through the model once; its KV
+  cache is reused (expanded to the batch) by every prompt starting with it
+- torch threads are set once for the whole process (GEN_TORCH_THREADS)
+
+Batches are static: a batch decodes until all of its prompts are done, new
+requests wait for the next batch.
+"""
+
+import copy
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+GEN_MODEL = "distilgpt2"
+
+RAG_PREAMBLE = """
+You are a helpful AI Assistant. Answer the question based only on the provided context.
+
+Context:
+"""
+
+_DONE = object()
+
+
+def configure_torch(threads: int = None):
+    import torch
+
+    threads = threads or int(os.getenv("GEN_TORCH_THREADS", 0)) or os.cpu_count() or 1
+    torch.set_num_threads(threads)
+    try:
+        # One op at a time: the batch already fills the intra-op threads
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # can only be set before the first parallel op of the process
+    return threads
+
+
+@dataclass
+class GenerationRequest:
+    prompt: str
+    max_new_tokens: int = 128
+    temperature: float = 0.7
+    top_k: int = 50
+    submitted: float = field(default_factory=time.perf_counter)
+    first_token: float = None
+    pieces: queue.Queue = field(default_factory=queue.Queue)
+
+    def stream(self):
+        """Yield text pieces as they are decoded; raises if generation failed."""
+        while True:
+            piece = self.pieces.get()
+            if piece is _DONE:
+                return
+            if isinstance(piece, Exception):
+                raise piece
+            yield piece
+
+    def result(self) -> str:
+        return "".join(self.stream())
+
+
+class GenerationService:
+    def __init__(
+            self,
+            model_name: str = GEN_MODEL,
+            prefix: str = RAG_PREAMBLE,
+            max_batch: int = 8,
+            window_ms: float = 20,
+            torch_threads: int = None
+    ):
+        self.model_name = model_name
+        self.prefix = prefix
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.torch_threads = torch_threads
+        self.stats = {"requests": 0, "batches": 0, "tokens": 0, "prefix_hits": 0}
+
+        self.model = None
+        self.tokenizer = None
+        self._prefix_ids = None
+        self._prefix_cache = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # ---------------------------
+    # 🏗️ MODEL
+    # ---------------------------
+
+    def load(self):
+        """Load the model and precompute the prefix KV cache (once)."""
+        with self._lock:
+            if self.model is not None:
+                return self
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+
+            configure_torch(self.torch_threads)
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.model = AutoModelForCausalLM.from_pretrained(self.model_name).eval()
+
+            if self.prefix:
+                self._prefix_ids = self.tokenizer(self.prefix, return_tensors="pt")["input_ids"]
+                with torch.inference_mode():
+                    self._prefix_cache = self.model(self._prefix_ids, use_cache=True).past_key_values
+
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="generation")
+            self._thread.start()
+        return self
+
+    # ---------------------------
+    # 📨 REQUESTS
+    # ---------------------------
+
+    def submit(self, prompt: str, max_new_tokens: int = 128, temperature: float = 0.7, top_k: int = 50):
+        """Queue a prompt; ValueError if max_new_tokens leaves no room for the prompt in the context window."""
+        self.load()
+        prefix_len = self._prefix_ids.shape[1] if self.prefix and prompt.startswith(self.prefix) else 0
+        room = self.model.config.n_positions - prefix_len - max_new_tokens
+        if room < 1:
+            raise ValueError(
+                f"max_new_tokens={max_new_tokens} leaves no room for the prompt "
+                f"({self.model.config.n_positions} positions, {prefix_len} used by the preamble)"
+            )
+        request = GenerationRequest(prompt, max_new_tokens, temperature, top_k)
+        self._queue.put(request)
+        return request
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        return self.submit(prompt, **kwargs).result()
+
+    def stream(self, prompt: str, **kwargs):
+        yield from self.submit(prompt, **kwargs).stream()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            # Prompts with the shared preamble start from its KV cache, the others from scratch
+            with_prefix = [r for r in batch if self.prefix and r.prompt.startswith(self.prefix)]
+            without_prefix = [r for r in batch if r not in with_prefix]
+            for group, use_prefix in ((with_prefix, True), (without_prefix, False)):
+                if not group:
+                    continue
+                try:
+                    self._decode(group, use_prefix)
+                except Exception as e:
+                    for request in group:
+                        request.pieces.put(e)
+                    continue
+                for request in group:
+                    request.pieces.put(_DONE)
+
+    # ---------------------------
+    # 🔁 DECODING
+    # ---------------------------
+
+    def _decode(self, requests, use_prefix: bool):
+        import torch
+
+        self.stats["requests"] += len(requests)
+        self.stats["batches"] += 1
+        pad_id = self.tokenizer.eos_token_id
+        max_positions = self.model.config.n_positions
+        prefix_len = self._prefix_ids.shape[1] if use_prefix else 0
+        max_new = max(r.max_new_tokens for r in requests)
+
+        # Prompt tokens after the prefix, left-truncated to fit the context window
+        room = max_positions - prefix_len - max_new
+        prompts = [r.prompt[len(self.prefix):] if use_prefix else r.prompt for r in requests]
+        # room >= 1 (checked in submit); ids[-0:] would be the whole prompt
+        suffixes = [(ids[-room:] if room > 0 else []) or [pad_id] for ids in self.tokenizer(prompts)["input_ids"]]
+        width = max(len(ids) for ids in suffixes)
+
+        # Left padding: real tokens of every row end at the same column
+        input_ids = torch.full((len(requests), width), pad_id, dtype=torch.long)
+        mask = torch.zeros((len(requests), width), dtype=torch.long)
+        for row, ids in enumerate(suffixes):
+            input_ids[row, width - len(ids):] = torch.tensor(ids, dtype=torch.long)
+            mask[row, width - len(ids):] = 1
+        position_ids = (prefix_len + mask.cumsum(-1) - 1).clamp(min=prefix_len)
+
+        past = None
+        attention_mask = mask
+        if use_prefix:
+            self.stats["prefix_hits"] += len(requests)
+            past = copy.deepcopy(self._prefix_cache)
+            past.batch_repeat_interleave(len(requests))
+            attention_mask = torch.cat([torch.ones((len(requests), prefix_len), dtype=torch.long), mask], dim=1)
+
+        generated = [[] for _ in requests]
+        emitted = [""] * len(requests)
+        finished = [False] * len(requests)
+        temperatures = torch.tensor([[r.temperature] for r in requests], dtype=torch.float)
+
+        with torch.inference_mode():
+            outputs = self.model(
+                input_ids=input_ids,
+                past_key_values=past,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                use_cache=True
+            )
+            for step in range(max_new):
+                next_tokens = self._sample(outputs.logits[:, -1, :], temperatures, requests)
+
+                for row, request in enumerate(requests):
+                    if finished[row]:
+                        continue
+                    token = int(next_tokens[row])
+                    if token == pad_id or step >= request.max_new_tokens:
+                        finished[row] = True
+                        continue
+                    generated[row].append(token)
+                    # Decode everything so far: byte-level BPE pieces can span tokens
+                    text = self.tokenizer.decode(generated[row], skip_special_tokens=True)
+                    if len(text) > len(emitted[row]) and not text.endswith("�"):
+                        if request.first_token is None:
+                            request.first_token = time.perf_counter()
+                        request.pieces.put(text[len(emitted[row]):])
+                        emitted[row] = text
+                    self.stats["tokens"] += 1
+
+                if all(finished):
+                    break
+                attention_mask = torch.cat([attention_mask, torch.ones((len(requests), 1), dtype=torch.long)], dim=1)
+                position_ids = position_ids[:, -1:] + 1
+                outputs = self.model(
+                    input_ids=next_tokens[:, None],
+                    past_key_values=outputs.past_key_values,
+                    attention_mask=attention_mask,
+                    position_ids=position_ids,
+                    use_cache=True
+                )
+
+    @staticmethod
+    def _sample(logits, temperatures, requests):
+        import torch
+
+        greedy = logits.argmax(dim=-1)
+        if all(r.temperature <= 0 for r in requests):
+            return greedy
+        top_k = max(r.top_k for r in requests)
+        values, indices = logits.topk(min(top_k, logits.shape[-1]), dim=-1)
+        probs = torch.softmax(values / temperatures.clamp(min=1e-5), dim=-1)
+        sampled = indices.gather(-1, torch.multinomial(probs, 1)).squeeze(-1)
+        use_greedy = torch.tensor([r.temperature <= 0 for r in requests])
+        return torch.where(use_greedy, greedy, sampled)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_generation_service():
+    """Process-wide service, configured with GEN_MODEL, GEN_MAX_BATCH, GEN_WINDOW_MS, GEN_TORCH_THREADS."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = GenerationService(
+                model_name=os.getenv("GEN_MODEL", GEN_MODEL),
+                max_batch=int(os.getenv("GEN_MAX_BATCH", 8)),
+                window_ms=float(os.getenv("GEN_WINDOW_MS", 20)),
+                torch_threads=int(os.getenv("GEN_TORCH_THREADS", 0)) or None
+            )
+        return _service
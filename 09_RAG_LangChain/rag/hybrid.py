@@ -0,0 +1,84 @@
+"""
+Hybrid retrieval (vector + BM25)
+---------------------------------
+The dense (vector) and sparse (BM25) searches run concurrently and their rankings
+are merged with Reciprocal Rank Fusion: score(chunk) = sum over rankings of 1 / (rrf_k + rank).
+Queries that look like exact keywords ("quoted text", fs.readFile, child_process)
+take a lexical-only fast path: no embedding, no vector search.
+A MetadataFilter is applied by both searches, never after fusing.
+"""
+
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from .bm25 import BM25Index
+from .filters import store_filter
+from .vector_index import fetch_documents
+
+QUOTED_RE = re.compile(r'^"[^"]+"$')
+CODE_TOKEN_RE = re.compile(r"\w+[.(]\w+|\w+_\w+|[a-z]+[A-Z]\w*|\w+\(\)")
+
+
+def is_lexical_query(query: str) -> bool:
+    query = query.strip()
+    if QUOTED_RE.match(query):
+        return True
+    # One or two words with an identifier in them: the user is looking for that exact symbol
+    return len(query.split()) <= 2 and bool(CODE_TOKEN_RE.search(query))
+
+
+def reciprocal_rank_fusion(rankings, rrf_k: int = 60):
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] += 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever:
+    def __init__(self, vector_db, bm25: BM25Index, candidates: int = 20, rrf_k: int = 60):
+        self.vector_db = vector_db
+        self.bm25 = bm25
+        self.candidates = candidates  # taken from each ranking before fusing
+        self.rrf_k = rrf_k
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bm25")
+
+    def _documents(self, ids, known=None):
+        docs = dict(known or {})
+        missing = [chunk_id for chunk_id in ids if chunk_id not in docs]
+        docs.update({doc.metadata["_id"]: doc for doc in fetch_documents(self.vector_db, missing)})
+        return docs
+
+    def lexical(self, sparse_hits, k: int):
+        """[(Document, bm25 score)] from BM25 hits only."""
+        sparse_hits = sparse_hits[:k]
+        docs = self._documents([chunk_id for chunk_id, _ in sparse_hits])
+        return [(docs[chunk_id], score) for chunk_id, score in sparse_hits if chunk_id in docs]
+
+    def fuse(self, dense_hits, sparse_hits, k: int):
+        """dense_hits: [(Document, score)], sparse_hits: [(chunk id, score)] -> [(Document, rrf score)]"""
+        known = {doc.metadata["_id"]: doc for doc, _ in dense_hits}
+        fused = reciprocal_rank_fusion(
+            [list(known), [chunk_id for chunk_id, _ in sparse_hits]],
+            rrf_k=self.rrf_k
+        )[:k]
+        docs = self._documents([chunk_id for chunk_id, _ in fused], known)
+        return [(docs[chunk_id], score) for chunk_id, score in fused if chunk_id in docs]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter=None):
+        if is_lexical_query(query):
+            sparse_hits = self.bm25.search(query.strip('"'), k, filter=filter)
+            if sparse_hits:
+                return self.lexical(sparse_hits, k)
+
+        # BM25 runs on a pool thread while this thread embeds + does the vector search
+        candidates = max(self.candidates, k)
+        sparse_future = self._pool.submit(self.bm25.search, query, candidates, filter)
+        dense_hits = self.vector_db.similarity_search_with_score(
+            query, k=candidates, filter=store_filter(self.vector_db, filter)
+        )
+        return self.fuse(dense_hits, sparse_future.result(), k)
+
+    def similarity_search(self, query: str, k: int = 4, filter=None):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter=filter)]
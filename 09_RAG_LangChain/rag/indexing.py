@@ -0,0 +1,279 @@
+"""
+Incremental PDF indexing
+---------------------------------
+Every chunk gets a stable id built from (source, page, start offset, content hash).
+Re-indexing only embeds the chunks whose id is not in the collection yet and
+deletes the ids that disappeared, so the collection is never empty and an
+unchanged PDF costs one parse plus one scroll over the stored ids.
+
+Everything is a generator: lazy pages -> per-page splitting -> bounded batches ->
+embed + upsert. At most a few pages and one batch are in memory at any time,
+so peak memory does not grow with the size of the PDF.
+"""
+
+import hashlib
+import os
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+from qdrant_client import QdrantClient, models
+
+from .bm25 import BM25Builder
+from .filters import ensure_payload_indexes, source_name
+from .quantization import enable_quantization, quantization_config, vectors_config
+
+# Fixed namespace so the same chunk always maps to the same Qdrant point id
+CHUNK_NAMESPACE = uuid.UUID("53e4d4e3-8e40-4a2b-8388-6c534497b0fa")
+
+
+# ---------------------------
+# 📄 PAGE PARSING (process pool)
+# ---------------------------
+
+_reader = None  # (path, PdfReader, page labels) of this process
+
+
+def _open_reader(pdf_path: str):
+    # Once per process, not per task: page_labels walks the whole PDF every time
+    global _reader
+    if _reader is None or _reader[0] != pdf_path:
+        reader = PdfReader(pdf_path)
+        _reader = (pdf_path, reader, reader.page_labels)
+    return _reader[1], _reader[2]
+
+
+def _close_reader():
+    global _reader
+    _reader = None
+
+
+def _parse_pages(pdf_path: str, start: int, stop: int):
+    # Runs inside a worker process: every worker opens its own reader (once, see _open_reader)
+    reader, labels = _open_reader(pdf_path)
+    total_pages = len(reader.pages)
+    pages = []
+    for i in range(start, stop):
+        pages.append(Document(
+            page_content=reader.pages[i].extract_text() or "",
+            # Same metadata keys PyPDFLoader writes, so the retrievers keep working
+            metadata={
+                "source": pdf_path,
+                "source_name": source_name(pdf_path),  # what source filters match
+                "page": i,
+                "page_label": labels[i],
+                "total_pages": total_pages,
+            }
+        ))
+    return pages
+
+
+def iter_pages(pdf_path, workers=None, pages_per_task: int = 8):
+    """Yield pages in order while the next pages are being parsed.
+
+    workers=0 parses lazily in this process. Otherwise at most 2 tasks per worker
+    are in flight, so parsed pages can't pile up when embedding is the slow part
+    (pool.map would submit the whole PDF at once).
+    """
+    pdf_path = str(pdf_path)
+    total_pages = len(PdfReader(pdf_path).pages)
+
+    if workers == 0:
+        try:
+            for start in range(0, total_pages, pages_per_task):
+                yield from _parse_pages(pdf_path, start, min(start + pages_per_task, total_pages))
+        finally:
+            _close_reader()
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_open_reader, initargs=(pdf_path,)) as pool:
+        in_flight = deque()
+        for start in range(0, total_pages, pages_per_task):
+            in_flight.append(pool.submit(_parse_pages, pdf_path, start, min(start + pages_per_task, total_pages)))
+            if len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def iter_chunks(pages, text_splitter, pages_per_split: int = 16):
+    # Split a few pages at a time instead of split_documents(all pages);
+    # token based splitters tokenize each group in one batched call
+    for group in batched(pages, pages_per_split):
+        yield from text_splitter.split_documents(group)
+
+
+def batched(items, size: int):
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+# ---------------------------
+# 🔑 CHUNK IDS
+# ---------------------------
+
+def chunk_id(chunk: Document) -> str:
+    meta = chunk.metadata
+    content_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+    key = f"{meta.get('source')}|{meta.get('page')}|{meta.get('start_index', 0)}|{content_hash}"
+    return str(uuid.uuid5(CHUNK_NAMESPACE, key))
+
+
+def default_text_splitter():
+    return RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=400,
+        add_start_index=True  # offset is part of the chunk id
+    )
+
+
+# ---------------------------
+# 🗄️ QDRANT HELPERS
+# ---------------------------
+
+def source_filter(source: str):
+    return models.Filter(must=[
+        models.FieldCondition(key="metadata.source", match=models.MatchValue(value=source))
+    ])
+
+
+def existing_ids(client: QdrantClient, collection_name: str, source: str):
+    ids = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=source_filter(source),
+            limit=1024,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False
+        )
+        ids.update(str(point.id) for point in points)
+        if offset is None:
+            return ids
+
+
+def ensure_collection(client: QdrantClient, collection_name: str, vector_size: int, quantization: str = None):
+    if not client.collection_exists(collection_name):
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=vectors_config(vector_size, quantized=bool(quantization)),
+            quantization_config=quantization_config(quantization)
+        )
+        ensure_payload_indexes(client, collection_name)
+
+
+def upsert_chunks(client: QdrantClient, collection_name: str, embedding, batch, quantization: str = None):
+    ids = [cid for cid, _ in batch]
+    chunks = [chunk for _, chunk in batch]
+    vectors = embedding.embed_documents([chunk.page_content for chunk in chunks])
+    ensure_collection(client, collection_name, len(vectors[0]), quantization)
+
+    # Same payload layout as QdrantVectorStore so from_existing_collection() can read it
+    client.upsert(
+        collection_name=collection_name,
+        points=[
+            models.PointStruct(
+                id=cid,
+                vector=vector,
+                payload={"page_content": chunk.page_content, "metadata": chunk.metadata}
+            )
+            for cid, chunk, vector in zip(ids, chunks, vectors)
+        ]
+    )
+
+
+# ---------------------------
+# 🚀 INDEXING
+# ---------------------------
+
+def index_pdf(
+        pdf_path,
+        embedding,
+        url: str = "http://localhost:6333",
+        collection_name: str = "learning_rag_hf",
+        text_splitter=None,
+        batch_size: int = None,
+        workers=None,
+        recreate: bool = False,
+        bm25_path=None,
+        quantization: str = None,
+        client: QdrantClient = None
+):
+    """Sync one PDF into the collection and return {added, unchanged, deleted}.
+
+    With bm25_path, a BM25 keyword index over the same chunk ids is (re)built and saved there.
+    batch_size: chunks per embed + upsert; by default EmbeddingService.preferred_batch_size
+    (one full batch per embedding worker), 64 for other LangChain Embeddings.
+    quantization: None (float vectors), "int8" or "pq" (see rag/quantization.py).
+    client: an existing QdrantClient (e.g. QdrantClient(":memory:")) instead of connecting to url.
+    """
+    source = str(pdf_path)
+    text_splitter = text_splitter or default_text_splitter()
+    client = client or QdrantClient(url=url)
+
+    if recreate and client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+
+    known = set()
+    if client.collection_exists(collection_name):
+        ensure_payload_indexes(client, collection_name)  # collections created before the indexes existed
+        if quantization:
+            enable_quantization(client, collection_name, quantization)
+        known = existing_ids(client, collection_name, source)
+        if known:
+            # Chunks indexed before source_name existed keep their ids: add the field in place
+            client.set_payload(
+                collection_name=collection_name,
+                payload={"source_name": source_name(source)},
+                key="metadata",
+                points=models.Filter(must=source_filter(source).must + [
+                    models.IsEmptyCondition(is_empty=models.PayloadField(key="metadata.source_name"))
+                ])
+            )
+
+    stats = {"added": 0, "unchanged": 0, "deleted": 0}
+    seen = set()  # only ids (36 chars per chunk), never chunk text
+    bm25 = BM25Builder() if bm25_path else None
+
+    def new_chunks(chunks):
+        for chunk in chunks:
+            cid = chunk_id(chunk)
+            if cid in seen:
+                continue
+            seen.add(cid)
+            if bm25 is not None:
+                bm25.add(cid, chunk.page_content, chunk.metadata)  # every chunk, also the unchanged ones
+
+            if cid in known:
+                stats["unchanged"] += 1
+            else:
+                yield cid, chunk
+
+    # Pages arrive from the process pool while this process embeds/upserts
+    batch_size = batch_size or getattr(embedding, "preferred_batch_size", 64)
+    pages = iter_pages(pdf_path, workers=workers)
+    for batch in batched(new_chunks(iter_chunks(pages, text_splitter)), batch_size):
+        upsert_chunks(client, collection_name, embedding, batch, quantization)
+        stats["added"] += len(batch)
+
+    # Chunks that were indexed before but are not in the PDF anymore
+    stale = known - seen
+    if stale:
+        client.delete(
+            collection_name=collection_name,
+            points_selector=models.PointIdsList(points=list(stale))
+        )
+        stats["deleted"] = len(stale)
+
+    if bm25 is not None:
+        bm25.build().save(bm25_path)
+
+    return stats
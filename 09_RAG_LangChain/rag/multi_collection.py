@@ -0,0 +1,49 @@
+"""
+Multi-collection retrieval
+---------------------------------
+Search several collections (one per corpus, e.g. learning_rag_hf + another
+PDF's collection) as if they were one: the query is embedded once, every
+collection is searched concurrently with the same filter, and the hits are
+merged by score into one top-k.
+
+Scores are comparable because every collection uses the same embedding model
+and distance (cosine). Works with QdrantVectorStore and LocalVectorIndex.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .filters import store_filter
+from .vector_index import LocalVectorIndex, qdrant_document
+
+
+def search_by_vector(vector_db, vector, k: int, filter=None):
+    """[(Document, score)] from one collection for an already embedded query."""
+    if isinstance(vector_db, LocalVectorIndex):
+        return vector_db.similarity_search_with_score_by_vector(vector, k, filter=filter)
+    response = vector_db.client.query_points(
+        collection_name=vector_db.collection_name,
+        query=list(vector),
+        query_filter=store_filter(vector_db, filter),
+        limit=k,
+        with_payload=True
+    )
+    return [(qdrant_document(point, vector_db.collection_name), point.score) for point in response.points]
+
+
+class MultiCollectionRetriever:
+    def __init__(self, stores, embedding):
+        self.stores = list(stores)
+        self.embedding = embedding  # the model every collection was indexed with
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.stores)), thread_name_prefix="fan-out")
+
+    def similarity_search_with_score_by_vector(self, vector, k: int = 4, filter=None):
+        futures = [self._pool.submit(search_by_vector, store, vector, k, filter) for store in self.stores]
+        hits = [hit for future in futures for hit in future.result()]
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits[:k]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter=None):
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter=None):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter=filter)]
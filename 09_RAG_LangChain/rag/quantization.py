@@ -0,0 +1,74 @@
+"""
+Vector quantization
+---------------------------------
+float32 vectors cost 4 bytes per dimension (1.5 KB per 384-d MiniLM vector,
+3 KB per 768-d text-embedding-004 vector). Qdrant can keep a compressed copy in
+RAM and the float originals on disk:
+
+- "int8": scalar quantization, 1 byte per dimension (4x smaller)
+- "pq":   product quantization, x16 compression by default (lossy, needs rescoring)
+
+Searches run on the compressed vectors, fetch `oversampling * k` candidates and
+rescore them with the float originals, so recall stays close to the float index.
+"""
+
+from qdrant_client import QdrantClient, models
+
+QUANTIZATION_KINDS = ("int8", "pq")
+
+
+def quantization_config(kind: str = None, pq_compression: str = "x16"):
+    """Qdrant quantization config for "int8" / "pq"; None keeps float vectors only."""
+    if not kind:
+        return None
+    if kind == "int8":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=0.99,      # clip outliers so the int8 range is not wasted on them
+            always_ram=True
+        ))
+    if kind == "pq":
+        return models.ProductQuantization(product=models.ProductQuantizationConfig(
+            compression=models.CompressionRatio(pq_compression),
+            always_ram=True
+        ))
+    raise ValueError(f"Unknown quantization {kind!r}, expected one of {QUANTIZATION_KINDS}")
+
+
+def search_params(oversampling: float = 2.0, rescore: bool = True):
+    """Search on the quantized vectors, rescore the top oversampling * k with the float ones."""
+    return models.SearchParams(quantization=models.QuantizationSearchParams(
+        rescore=rescore,
+        oversampling=oversampling
+    ))
+
+
+def vectors_config(size: int, quantized: bool = False):
+    # Originals go to disk when a quantized copy serves the searches from RAM
+    return models.VectorParams(size=size, distance=models.Distance.COSINE, on_disk=quantized or None)
+
+
+def enable_quantization(client: QdrantClient, collection_name: str, kind: str):
+    """Quantize an existing collection and move its float originals to disk.
+
+    Qdrant builds the compressed copy in the background. quantization_config alone would
+    leave the originals in RAM next to it, so on_disk is switched on as well, like
+    vectors_config(quantized=True) does for new collections (unnamed vector: key "").
+    """
+    client.update_collection(
+        collection_name=collection_name,
+        vectors_config={"": models.VectorParamsDiff(on_disk=True)},
+        quantization_config=quantization_config(kind)
+    )
+
+
+def bytes_per_vector(size: int, kind: str = None, pq_compression: str = "x16") -> float:
+    """Estimated RAM of one vector, vector data only (no HNSW graph, payload or overhead).
+
+    Assumes the float originals are on disk when quantized, as vectors_config/enable_quantization set it up.
+    """
+    if not kind:
+        return 4.0 * size
+    if kind == "int8":
+        return 1.0 * size
+    return 4.0 * size / int(pq_compression.lstrip("x"))
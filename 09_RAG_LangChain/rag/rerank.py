@@ -0,0 +1,105 @@
+"""
+Cross-encoder reranking
+---------------------------------
+Retrieve many candidates cheaply (vector / hybrid search), then score every
+(query, chunk) pair with a small CPU cross-encoder and keep the best k.
+
+- batches of pairs go through the model together
+- per-query latency budget: if the next batch would not finish in time, the
+  candidates are returned in their original (vector) order instead
+- (query, chunk) scores are kept in an LRU cache, so repeated queries are free
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class Reranker:
+    def __init__(
+            self,
+            model_name: str = RERANK_MODEL,
+            batch_size: int = 16,
+            budget_ms: float = 200,
+            cache_size: int = 50_000
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.cache_size = cache_size
+        self.stats = {"queries": 0, "fallbacks": 0, "cache_hits": 0, "scored": 0}
+
+        self._model = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._batch_seconds = None  # moving average, used to predict if the next batch fits
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                self._model = CrossEncoder(self.model_name, device="cpu")
+            return self._model
+
+    @staticmethod
+    def _key(query: str, doc):
+        chunk = doc.metadata.get("_id") or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+        return hashlib.sha1(query.strip().lower().encode("utf-8")).hexdigest(), chunk
+
+    def _cached(self, key):
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, key, score: float):
+        with self._lock:
+            self._cache[key] = score
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def rerank(self, query: str, hits, k: int = 3, budget_ms: float = None):
+        """hits: [(Document, retrieval score)] best first -> best k as [(Document, score)].
+
+        Over the budget, the first k hits are returned unchanged (retrieval order and scores).
+        """
+        hits = list(hits)
+        docs = [doc for doc, _ in hits]
+        model = self.model  # loading the model does not count against the budget
+        budget = (budget_ms if budget_ms is not None else self.budget_ms) / 1000
+        deadline = time.perf_counter() + budget
+        self.stats["queries"] += 1
+
+        keys = [self._key(query, doc) for doc in docs]
+        scores = [self._cached(key) for key in keys]
+        pending = [i for i, score in enumerate(scores) if score is None]
+        self.stats["cache_hits"] += len(docs) - len(pending)
+
+        for start in range(0, len(pending), self.batch_size):
+            expected = self._batch_seconds or 0.0
+            if time.perf_counter() + expected > deadline:
+                self.stats["fallbacks"] += 1
+                return hits[:k]
+
+            batch = pending[start:start + self.batch_size]
+            batch_start = time.perf_counter()
+            batch_scores = model.predict(
+                [(query, docs[i].page_content) for i in batch],
+                batch_size=len(batch),
+                show_progress_bar=False
+            )
+            elapsed = time.perf_counter() - batch_start
+            self._batch_seconds = elapsed if self._batch_seconds is None else 0.8 * self._batch_seconds + 0.2 * elapsed
+
+            for i, score in zip(batch, batch_scores):
+                scores[i] = float(score)
+                self._store(keys[i], scores[i])
+            self.stats["scored"] += len(batch)
+
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+        return [(docs[i], scores[i]) for i in order[:k]]
@@ -0,0 +1,128 @@
+"""
+Semantic query cache
+---------------------------------
+Paraphrases ("what is the event loop" / "explain node event loop") embed to
+nearby vectors. The cache keeps the normalized query vectors of recent queries
+in one matrix; a new query whose cosine similarity to a cached one is at least
+`threshold` gets the cached value (retrieval results, optionally the answer)
+without running the search or the LLM.
+
+- lookup = one matrix-vector product over at most max_entries vectors
+- entries expire after `ttl` seconds; when full, the least recently used is replaced
+- namespaces keep results of differently filtered searches apart
+- hits / misses / expired counters, like EmbeddingCache
+
+In-process: threads of one worker share it, forked workers each have their own.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.92, ttl: float = 3600, max_entries: int = 10_000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+        self._lock = threading.Lock()
+        self._vectors = None        # (max_entries, dim), allocated on the first store
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._expires = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+        self._namespaces = np.zeros(max_entries, dtype=np.int64)  # codes, 0 = no namespace
+        self._namespace_codes = {None: 0}
+        self._entries = [None] * max_entries
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return int(self._valid.sum())
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _expire(self, now: float):
+        stale = self._valid & (self._expires <= now)
+        if stale.any():
+            self.expired += int(stale.sum())
+            self._valid[stale] = False
+            for slot in np.flatnonzero(stale):
+                self._entries[slot] = None
+
+    def lookup(self, vector, namespace=None):
+        """Return (entry, similarity) for the closest cached query above the threshold, else (None, best similarity).
+
+        entry is the dict given to store(): {"query", "value", "answer"}.
+        """
+        query = self._normalize(vector)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if self._vectors is None or not self._valid.any():
+                self.misses += 1
+                return None, 0.0
+
+            code = self._namespace_codes.get(namespace)
+            if code is None:  # nothing was ever stored under this namespace
+                self.misses += 1
+                return None, 0.0
+
+            scores = self._vectors @ query
+            scores[~(self._valid & (self._namespaces == code))] = -np.inf
+
+            slot = int(np.argmax(scores))
+            similarity = float(scores[slot])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None, max(similarity, 0.0)
+
+            self.hits += 1
+            self._last_used[slot] = now
+            return self._entries[slot], similarity
+
+    def store(self, vector, query: str, value, answer=None, namespace=None):
+        """Cache value (and answer) for this query vector; returns the entry."""
+        vector = self._normalize(vector)
+        now = time.time()
+        entry = {"query": query, "value": value, "answer": answer}
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            self._expire(now)
+
+            free = np.flatnonzero(~self._valid)
+            slot = int(free[0]) if len(free) else int(np.argmin(self._last_used))  # LRU when full
+            self._vectors[slot] = vector
+            self._valid[slot] = True
+            self._expires[slot] = now + self.ttl
+            self._last_used[slot] = now
+            self._namespaces[slot] = self._namespace_codes.setdefault(namespace, len(self._namespace_codes))
+            self._entries[slot] = entry
+        return entry
+
+    def set_answer(self, entry: dict, answer):
+        """Attach the generated answer to an entry returned by lookup() / store()."""
+        entry["answer"] = answer
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round(self.hit_rate, 4),
+            "entries": len(self),
+        }
+
+    def __str__(self):
+        return f"{self.hits} hits / {self.misses} misses ({self.hit_rate:.0%} hit rate, {len(self)} entries)"
@@ -0,0 +1,239 @@
+"""
+In-process vector index
+---------------------------------
+A local stand-in for the Qdrant collection, for collections that fit in RAM:
+- small collections: one matmul over all (normalized) vectors + argpartition top-k
+- large collections: IVF (k-means coarse clusters, only nprobe clusters are scanned)
+- save()/load() to a folder; load() memory-maps the vectors, so startup is instant
+- filter=MetadataFilter(...) only scores the matching rows
+
+It exposes the same similarity_search() calls as QdrantVectorStore and returns the
+same Documents (payload "page_content" / "metadata"), so it plugs into the retrievers.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import orjson
+from langchain_core.documents import Document
+
+from .filters import MaskCache
+
+IVF_THRESHOLD = 50_000  # below this, brute force is faster than probing clusters
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int):
+    # argpartition is O(n); only the k winners get sorted
+    k = min(k, scores.shape[-1])
+    if k == 0:
+        empty = np.empty(scores.shape[:-1] + (0,))
+        return empty.astype(scores.dtype), empty.astype(np.int64)
+    top = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    top_scores = np.take_along_axis(scores, top, axis=-1)
+    order = np.argsort(-top_scores, axis=-1)
+    return np.take_along_axis(top_scores, order, axis=-1), np.take_along_axis(top, order, axis=-1)
+
+
+def _kmeans(vectors: np.ndarray, nlist: int, iters: int = 10, seed: int = 0):
+    # Spherical k-means on a sample: good enough for coarse clustering
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), min(len(vectors), nlist * 64), replace=False)]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        filled = np.bincount(assign, minlength=nlist) > 0
+        centroids[filled] = _normalize(sums[filled])
+    return centroids
+
+
+class LocalVectorIndex:
+    def __init__(self, vectors, ids, payloads, embedding=None, nprobe: int = 8, collection_name: str = None):
+        self.vectors = _normalize(vectors) if not isinstance(vectors, np.memmap) else vectors
+        self.ids = list(ids)
+        self.payloads = list(payloads)
+        self.embedding = embedding
+        self.nprobe = nprobe
+        self.collection_name = collection_name
+
+        # IVF structure: centroids + row ids grouped by cluster (CSR style offsets)
+        self.centroids = None
+        self.order = None
+        self.offsets = None
+        self._masks = MaskCache()
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ---------------------------
+    # 🏗️ BUILD / IO
+    # ---------------------------
+
+    @classmethod
+    def from_qdrant(cls, client, collection_name: str, embedding=None, **kwargs):
+        ids, vectors, payloads = [], [], []
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=1024,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            for point in points:
+                ids.append(str(point.id))
+                vectors.append(point.vector)
+                payloads.append(point.payload)
+            if offset is None:
+                break
+
+        index = cls(vectors, ids, payloads, embedding=embedding, collection_name=collection_name, **kwargs)
+        if len(index) >= IVF_THRESHOLD:
+            index.build_ivf()
+        return index
+
+    def build_ivf(self, nlist: int = None):
+        nlist = nlist or max(1, int(4 * np.sqrt(len(self))))
+        self.centroids = _kmeans(np.asarray(self.vectors), nlist)
+
+        assign = np.empty(len(self), dtype=np.int32)
+        for start in range(0, len(self), 65536):
+            block = np.asarray(self.vectors[start:start + 65536])
+            assign[start:start + 65536] = np.argmax(block @ self.centroids.T, axis=1)
+
+        self.order = np.argsort(assign, kind="stable").astype(np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "vectors.npy", np.asarray(self.vectors, dtype=np.float32))
+        (path / "payloads.json").write_bytes(orjson.dumps({
+            "collection_name": self.collection_name,
+            "ids": self.ids,
+            "payloads": self.payloads
+        }))
+        if self.centroids is not None:
+            np.save(path / "centroids.npy", self.centroids)
+            np.save(path / "order.npy", self.order)
+            np.save(path / "offsets.npy", self.offsets)
+
+    @classmethod
+    def load(cls, path, embedding=None, **kwargs):
+        path = Path(path)
+        meta = orjson.loads((path / "payloads.json").read_bytes())
+        # Vectors stay on disk and are paged in by the OS on first use
+        vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        index = cls(vectors, meta["ids"], meta["payloads"], embedding=embedding,
+                    collection_name=meta.get("collection_name"), **kwargs)
+        if (path / "centroids.npy").exists():
+            index.centroids = np.load(path / "centroids.npy")
+            index.order = np.load(path / "order.npy", mmap_mode="r")
+            index.offsets = np.load(path / "offsets.npy")
+        return index
+
+    # ---------------------------
+    # 🔎 SEARCH
+    # ---------------------------
+
+    def _metadatas(self):
+        return (payload.get("metadata") for payload in self.payloads)
+
+    def search(self, query_vectors, k: int = 3, filter=None):
+        """Return (scores, row indices) per query, best first.
+
+        Shaped (num_queries, k) for an exact search without a filter. With a filter or the
+        IVF index, lists of per-query arrays: the probed clusters can hold fewer than k rows.
+        """
+        queries = _normalize(np.atleast_2d(query_vectors))
+        mask = self._masks.get(filter, self._metadatas()) if filter else None
+
+        if mask is not None and (self.centroids is None or mask.sum() < IVF_THRESHOLD):
+            # Selective filter: scan only the matching rows
+            rows = np.flatnonzero(mask)
+            scores, top = _top_k(queries @ np.asarray(self.vectors[rows]).T, k)
+            return scores, rows[top]
+        if self.centroids is None:
+            return _top_k(queries @ self.vectors.T, k)
+
+        all_scores, all_rows = [], []
+        probes = _top_k(queries @ self.centroids.T, self.nprobe)[1]
+        for query, clusters in zip(queries, probes):
+            rows = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in clusters])
+            if mask is not None:
+                rows = rows[mask[rows]]
+            scores, top = _top_k(self.vectors[rows] @ query, k)
+            all_scores.append(scores)
+            all_rows.append(rows[top])
+        return all_scores, all_rows  # lengths can differ (small clusters, filter)
+
+    def _document(self, row: int):
+        payload = self.payloads[row]
+        metadata = dict(payload.get("metadata") or {})
+        metadata["_id"] = self.ids[row]
+        metadata["_collection_name"] = self.collection_name
+        return Document(page_content=payload.get("page_content", ""), metadata=metadata)
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4, filter=None):
+        scores, rows = self.search(embedding, k, filter=filter)
+        return [(self._document(row), float(score)) for score, row in zip(scores[0], rows[0])]
+
+    def similarity_search_with_score_batch_by_vector(self, embeddings, k: int = 4, filter=None):
+        """One matmul for many queries; returns one list of (Document, score) per query."""
+        scores, rows = self.search(embeddings, k, filter=filter)
+        return [
+            [(self._document(row), float(score)) for score, row in zip(query_scores, query_rows)]
+            for query_scores, query_rows in zip(scores, rows)
+        ]
+
+    def get_by_ids(self, ids):
+        if not hasattr(self, "_row_by_id"):
+            self._row_by_id = {point_id: row for row, point_id in enumerate(self.ids)}
+        return [self._document(self._row_by_id[i]) for i in ids if i in self._row_by_id]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter=None):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter=filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter=None):
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter=None):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter=filter)]
+
+
+def qdrant_document(point, collection_name: str):
+    """Qdrant point (LangChain payload layout) -> Document, same metadata as QdrantVectorStore."""
+    return Document(
+        page_content=point.payload.get("page_content", ""),
+        metadata={**(point.payload.get("metadata") or {}), "_id": str(point.id), "_collection_name": collection_name}
+    )
+
+
+def fetch_documents(vector_db, ids):
+    """Documents for chunk ids, from a QdrantVectorStore or a LocalVectorIndex."""
+    ids = list(ids)
+    if not ids:
+        return []
+    if isinstance(vector_db, LocalVectorIndex):
+        return vector_db.get_by_ids(ids)
+    points = vector_db.client.retrieve(collection_name=vector_db.collection_name, ids=ids, with_payload=True)
+    return [qdrant_document(point, vector_db.collection_name) for point in points]
+
+
+def recall_at_k(local_index: LocalVectorIndex, vector_db, queries, k: int = 3):
+    """Share of Qdrant's top-k ids that the local index also returns (1.0 = identical)."""
+    found = total = 0
+    for query in queries:
+        expected = {doc.metadata["_id"] for doc in vector_db.similarity_search(query, k=k)}
+        got = {doc.metadata["_id"] for doc in local_index.similarity_search(query, k=k)}
+        found += len(expected & got)
+        total += len(expected)
+    return found / total if total else 1.0
@@ -0,0 +1,458 @@
+"""
+End-to-end RAG benchmark
+---------------------------------
+Runs every RAG path on a synthetic corpus, without the real models or servers:
+
+- corpus:    a generated PDF (--pages pages of topic sentences), written to a temp folder
+- indexing:  the 01_index.py flow (index_pdf: parse -> split -> embed -> upsert + BM25)
+- retrieval: the 03_retrieve_hf.py flow, vector only and hybrid (vector + BM25)
+- answer:    the 04_retrieve_hf_2.py flow: hybrid search -> context packing -> LLM stub
+- queued:    the 10_RAG_Queue flow: jobs run process_query on worker threads, through
+             RQ when Redis is reachable (--redis), otherwise through an in-process queue
+
+Stand-ins: Qdrant runs in memory (QdrantClient(":memory:")) unless --qdrant-url is given,
+embeddings come from a token hashing stub (--embed-ms adds a per-text cost), the LLM
+stub emits --llm-tokens tokens at --llm-ms each.
+
+Every query is a sentence of a known page with some words dropped; recall@k is
+the share of queries whose top-k contains a chunk of that page.
+
+Results (docs/sec, p50/p95/p99, memory high-water mark, recall@k) are printed and
+written as JSON. With --baseline, metrics worse than the baseline by more than
+--tolerance are listed and the exit code is 1.
+
+Usage:
+    python -m 10_RAG_Queue.benchmark --pages 200 --queries 300
+    python -m 10_RAG_Queue.benchmark --output new.json --baseline old.json
+"""
+
+import argparse
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import orjson
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+from redis import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from .queues import worker
+from .queues.run_worker import ThreadWorker
+from .client.serializer import MsgpackSerializer
+
+# worker.py has put 09_RAG_LangChain on sys.path
+from rag.bm25 import BM25Index, tokenize
+from rag.context import ContextPacker, assemble_context
+from rag.hybrid import HybridRetriever
+from rag.indexing import default_text_splitter, index_pdf
+
+COLLECTION_NAME = "benchmark_rag"
+DEFAULT_OUTPUT = worker.RAG_DIR / ".cache" / "benchmark" / "results.json"
+
+
+# ---------------------------
+# 📄 SYNTHETIC CORPUS
+# ---------------------------
+
+def make_corpus(pages: int, sentences_per_page: int = 12, topics: int = 50, seed: int = 0):
+    """Pages of sentences; every page draws most of its words from one topic vocabulary."""
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pu", "dra", "fen", "gor", "hul"]
+    word = lambda: "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+    common = [word() for _ in range(300)]
+    vocabularies = [[word() for _ in range(60)] for _ in range(topics)]
+
+    corpus = []
+    for page in range(pages):
+        vocabulary = vocabularies[page % topics]
+        sentences = []
+        for _ in range(sentences_per_page):
+            words = [rng.choice(vocabulary) if rng.random() < 0.6 else rng.choice(common) for _ in range(rng.randint(8, 16))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        corpus.append(sentences)
+    return corpus
+
+
+def _pdf_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, corpus, line_chars: int = 90):
+    """Minimal PDF (Helvetica text, one content stream per page) that pypdf can extract."""
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>", 3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    for i, sentences in enumerate(corpus):
+        lines, line = [], ""
+        for sentence in sentences:
+            for token in sentence.split():
+                if len(line) + len(token) + 1 > line_chars:
+                    lines.append(line)
+                    line = ""
+                line = f"{line} {token}".strip()
+        lines.append(line)
+
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_pdf_text(l)}) Tj T*" for l in lines) + " ET"
+        page_id, content_id = 4 + 2 * i, 5 + 2 * i
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode()
+        objects[content_id] = f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode()
+        kids.append(f"{page_id} 0 R")
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += f"{number} 0 obj\n".encode() + objects[number] + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offsets[n]:010d} 00000 n \n".encode() for n in sorted(objects))
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+
+
+def make_queries(corpus, n: int, drop: float = 0.3, seed: int = 1):
+    """(query, page it was taken from): a sentence of the page with some words dropped."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        page = rng.randrange(len(corpus))
+        words = rng.choice(corpus[page]).rstrip(".").split()
+        kept = [w for w in words if rng.random() > drop] or words
+        queries.append((" ".join(kept), page))
+    return queries
+
+
+# ---------------------------
+# 🧪 STUBS
+# ---------------------------
+
+class HashingEmbeddings(Embeddings):
+    """Stand-in for the embedding service: signed token hashing into `dim` dimensions."""
+
+    def __init__(self, dim: int = 384, cost_ms: float = 0.0):
+        self.dim = dim
+        self.cost = cost_ms / 1000
+
+    def embed(self, texts):
+        texts = list(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                h = zlib.crc32(token.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 1 << 31 else -1.0
+        if self.cost:
+            time.sleep(self.cost * len(texts))
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def embed_documents(self, texts):
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed([text])[0].tolist()
+
+
+class WhitespaceTokenizer:
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, ids):
+        return " ".join(ids)
+
+
+class StubLLM:
+    """Streams `tokens` words of the prompt back, `token_ms` apart."""
+
+    def __init__(self, tokens: int = 64, token_ms: float = 0.0):
+        self.tokens = tokens
+        self.token_delay = token_ms / 1000
+
+    def stream(self, prompt: str):
+        for token in prompt.split()[:self.tokens]:
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield token + " "
+
+
+# ---------------------------
+# 📏 MEASUREMENT
+# ---------------------------
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+def max_rss_mib():
+    """High-water mark of this process and of its finished children (process pools)."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1 if sys.platform == "darwin" else 1024  # bytes on macOS, KiB on Linux
+    return {"max_rss_mib": own * scale / 2 ** 20, "children_max_rss_mib": children * scale / 2 ** 20}
+
+
+def hit(docs, page: int) -> bool:
+    return any(doc.metadata.get("page") == page for doc in docs)
+
+
+def run_search(search, queries, k: int):
+    latencies, hits = [], 0
+    for query, page in queries:
+        start = time.perf_counter()
+        docs = search(query, k)
+        latencies.append(time.perf_counter() - start)
+        hits += hit(docs, page)
+    return {
+        "queries_per_sec": len(queries) / sum(latencies),
+        **percentiles(latencies),
+        f"recall@{k}": hits / len(queries),
+    }
+
+
+# ---------------------------
+# 🚀 FLOWS
+# ---------------------------
+
+def bench_indexing(pdf_path, embedding, client, bm25_path, pages: int):
+    start = time.perf_counter()
+    stats = index_pdf(
+        pdf_path,
+        embedding=embedding,
+        client=client,
+        collection_name=COLLECTION_NAME,
+        text_splitter=default_text_splitter(),
+        bm25_path=bm25_path
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        "pages": pages,
+        "chunks": stats["added"],
+        "seconds": elapsed,
+        "docs_per_sec": pages / elapsed,
+        "chunks_per_sec": stats["added"] / elapsed,
+        **max_rss_mib(),
+    }
+
+
+def bench_answer(retriever, queries, k: int, llm: StubLLM, context_tokens: int):
+    packer = ContextPacker(WhitespaceTokenizer(), budget_tokens=context_tokens)
+    latencies, first_tokens, hits = [], [], 0
+    for query, page in queries:
+        start = time.perf_counter()
+        results = retriever.similarity_search_with_score(query, k=k)
+        context, packed = assemble_context(results, packer)
+        stream = llm.stream(f"{context}\n\nQuestion: {query}\n\nAnswer:")
+        next(stream, None)
+        first_tokens.append(time.perf_counter() - start)
+        for _ in stream:
+            pass
+        latencies.append(time.perf_counter() - start)
+        hits += hit([doc for doc, _ in packed], page)
+    return {
+        **percentiles(latencies),
+        "first_token_p50_ms": percentiles(first_tokens)["p50_ms"],
+        f"recall@{k}": hits / len(queries),
+    }
+
+
+def use_stand_ins(embedding, vector_db, bm25):
+    """Point the queue worker at the stand-ins (it reads these globals at call time)."""
+    worker.embedding_model = embedding
+    worker._vector_db = vector_db
+    worker._bm25 = bm25
+    worker._hybrid = None
+
+
+def redis_connection(url: str):
+    connection = Redis.from_url(url)
+    try:
+        connection.ping()
+    except RedisConnectionError:
+        return None
+    return connection
+
+
+def bench_queued_rq(connection, queries, workers: int):
+    from rq import Queue
+
+    queue = Queue("benchmark", connection=connection, serializer=MsgpackSerializer)
+    queue.empty()
+    start = time.perf_counter()
+    jobs = [queue.enqueue(worker.process_query, query, result_ttl=600) for query, _ in queries]
+
+    def run():
+        ThreadWorker([queue], connection=Redis(connection_pool=connection.connection_pool),
+                     serializer=MsgpackSerializer).work(burst=True)
+
+    threads = [threading.Thread(target=run, name=f"bench-worker-{i}") for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies, service, results = [], [], []
+    for job in jobs:
+        job.refresh()
+        results.append(job.return_value() or [])
+        if job.ended_at and job.enqueued_at:
+            latencies.append((job.ended_at - job.enqueued_at).total_seconds())
+            service.append((job.ended_at - job.started_at).total_seconds())
+    return elapsed, latencies, service, results
+
+
+def bench_queued_local(queries, workers: int):
+    start = time.perf_counter()
+
+    def run(query, submitted):
+        began = time.perf_counter()
+        result = worker.process_query(query)
+        done = time.perf_counter()
+        return done - submitted, done - began, result
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run, query, time.perf_counter()) for query, _ in queries]
+        outcomes = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+    return elapsed, [o[0] for o in outcomes], [o[1] for o in outcomes], [o[2] for o in outcomes]
+
+
+def bench_queued(queries, workers: int, redis_url: str, batch_window_ms: float):
+    worker.configure_batching(batch_window_ms if workers > 1 else 0)
+    connection = redis_connection(redis_url) if redis_url else None
+    if connection is not None:
+        elapsed, latencies, service, results = bench_queued_rq(connection, queries, workers)
+    else:
+        elapsed, latencies, service, results = bench_queued_local(queries, workers)
+
+    # Compact results carry page_label; the generated PDF has no /PageLabels, so pypdf numbers from 1
+    hits = sum(
+        any(r.get("page") == str(page + 1) for r in result)
+        for result, (_, page) in zip(results, queries)
+    )
+    return {
+        "transport": "rq" if connection is not None else "in-process",
+        "workers": workers,
+        "jobs_per_sec": len(queries) / elapsed,
+        **percentiles(latencies),
+        "service_p50_ms": percentiles(service)["p50_ms"],
+        "recall@3": hits / len(queries),
+    }
+
+
+# ---------------------------
+# 📊 REPORT
+# ---------------------------
+
+HIGHER_IS_BETTER = ("_per_sec", "recall@")
+
+
+def regressions(results, baseline, tolerance: float):
+    found = []
+    for flow, metrics in results["flows"].items():
+        for name, value in metrics.items():
+            old = baseline.get("flows", {}).get(flow, {}).get(name)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            if not (name.endswith("_ms") or name.endswith("_mib") or any(tag in name for tag in HIGHER_IS_BETTER)):
+                continue
+            higher_is_better = any(tag in name for tag in HIGHER_IS_BETTER)
+            change = (value - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                found.append(f"{flow}.{name}: {old:.4g} -> {value:.4g} ({change:+.0%})")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end RAG benchmark on a synthetic corpus")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--embed-ms", type=float, default=0.0, help="Simulated embedding cost per text")
+    parser.add_argument("--llm-tokens", type=int, default=64)
+    parser.add_argument("--llm-ms", type=float, default=0.0, help="Simulated LLM cost per token")
+    parser.add_argument("--context-tokens", type=int, default=320)
+    parser.add_argument("--workers", type=int, default=4, help="Queue worker threads")
+    parser.add_argument("--batch-window-ms", type=float, default=10)
+    parser.add_argument("--qdrant-url", help="Use a Qdrant server instead of the in-memory client")
+    parser.add_argument("--redis", default="redis://localhost:6379", help="Redis for the RQ flow ('' = in-process queue)")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT))
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative change before a metric regresses")
+    args = parser.parse_args()
+
+    embedding = HashingEmbeddings(cost_ms=args.embed_ms)
+    client = QdrantClient(url=args.qdrant_url) if args.qdrant_url else QdrantClient(location=":memory:")
+    flows = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        # 1. Corpus
+        corpus = make_corpus(args.pages)
+        pdf_path = tmp / "corpus.pdf"
+        write_pdf(pdf_path, corpus)
+        queries = make_queries(corpus, args.queries)
+        print(f"📄 {args.pages} pages, {args.queries} queries")
+
+        # 2. Indexing (01_index.py)
+        flows["indexing"] = bench_indexing(pdf_path, embedding, client, tmp / "bm25", args.pages)
+        print(f"🏗️ indexing: {flows['indexing']['docs_per_sec']:.1f} pages/s, {flows['indexing']['chunks']} chunks")
+
+        # 3. Retrieval (03_retrieve_hf.py)
+        vector_db = QdrantVectorStore(client=client, collection_name=COLLECTION_NAME, embedding=embedding)
+        bm25 = BM25Index.load(tmp / "bm25")
+        hybrid = HybridRetriever(vector_db, bm25)
+        flows["vector"] = run_search(lambda q, k: vector_db.similarity_search(q, k=k), queries, args.k)
+        flows["hybrid"] = run_search(lambda q, k: hybrid.similarity_search(q, k=k), queries, args.k)
+
+        # 4. Answer (04_retrieve_hf_2.py)
+        flows["answer"] = bench_answer(hybrid, queries, args.k, StubLLM(args.llm_tokens, args.llm_ms), args.context_tokens)
+
+        # 5. Queued (10_RAG_Queue)
+        use_stand_ins(embedding, vector_db, bm25)
+        flows["queued"] = bench_queued(queries, args.workers, args.redis, args.batch_window_ms)
+
+    flows["memory"] = max_rss_mib()
+    if args.qdrant_url:
+        client.delete_collection(COLLECTION_NAME)
+
+    results = {
+        "timestamp": time.time(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "flows": flows,
+    }
+
+    print()
+    for flow, metrics in flows.items():
+        shown = ", ".join(f"{name}={value:.3g}" if isinstance(value, float) else f"{name}={value}" for name, value in metrics.items())
+        print(f"{flow:<10} {shown}")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+    print(f"\n💾 {output}")
+
+    if args.baseline:
+        found = regressions(results, orjson.loads(Path(args.baseline).read_bytes()), args.tolerance)
+        for line in found:
+            print(f"🔻 {line}")
+        if found:
+            sys.exit(1)
+        print("✅ no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,61 @@
-from redis import Redis
+import os
+from redis import BlockingConnectionPool, Redis
+from redis import asyncio as aioredis
 from rq import Queue
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+from .serializer import MsgpackSerializer
 
-queue = Queue(connection=Redis(
-    host="localhost",
-    port=6379
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", 64))
+
+# Connection pool settings
+pool_options = dict(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    max_connections=REDIS_POOL_SIZE,
+    timeout=float(os.getenv("REDIS_POOL_TIMEOUT", 5)),                   # wait for a free connection
+    socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", 2)),
+    socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", 5)),
+    health_check_interval=int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30)),
+    socket_keepalive=True,
+    retry_on_timeout=True,
+)
+
+# Sync pool: RQ is synchronous, the server calls it from a thread pool
+redis_conn = Redis(connection_pool=BlockingConnectionPool(**pool_options))
+
+# Async client for the server's plain commands (queue depth), no thread pool hop
+async_redis = aioredis.Redis(connection_pool=aioredis.BlockingConnectionPool(**pool_options))
+
+# Separate async client for the server's job-event listener (one pub/sub connection for
+# every long-poll / SSE client). No socket timeout, the subscription is idle between
+# jobs; health checks catch dead connections.
+events_redis = aioredis.Redis(connection_pool=aioredis.BlockingConnectionPool(
+    **{**pool_options, "max_connections": 4, "socket_timeout": None}
 ))
+
+# Job lifetimes (seconds): Redis only keeps what clients can still ask for
+RESULT_TTL = int(os.getenv("RAG_RESULT_TTL", 300))      # finished results
+FAILURE_TTL = int(os.getenv("RAG_FAILURE_TTL", 3600))   # failed jobs, for debugging
+JOB_TTL = int(os.getenv("RAG_JOB_TTL", 120))            # max time a job may wait in the queue
+
+# Priority queues: workers always drain "interactive" before "bulk"
+QUEUE_NAMES = ("interactive", "bulk")
+MAX_QUEUE_DEPTH = {
+    "interactive": int(os.getenv("RAG_MAX_QUEUE_DEPTH_INTERACTIVE", 500)),
+    "bulk": int(os.getenv("RAG_MAX_QUEUE_DEPTH_BULK", 5000)),
+}
+# Rough drain rate of the worker pool, used for the Retry-After hint on 429
+EXPECTED_JOBS_PER_SEC = float(os.getenv("RAG_EXPECTED_JOBS_PER_SEC", 50))
+
+queues = {name: Queue(name, connection=redis_conn, serializer=MsgpackSerializer) for name in QUEUE_NAMES}
+queue = queues["interactive"]
+
+def fetch_job(job_id: str):
+    # Queue.fetch_job() only finds jobs of that one queue
+    try:
+        return Job.fetch(job_id, connection=redis_conn, serializer=MsgpackSerializer)
+    except NoSuchJobError:
+        return None
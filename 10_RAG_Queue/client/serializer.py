@@ -0,0 +1,16 @@
+import ormsgpack
+
+
+class MsgpackSerializer:
+    """RQ serializer: job args and compact results are plain dicts/lists, msgpack is smaller and faster than pickle.
+
+    Workers must use it too: run_worker.py does, or `rq worker --serializer 10_RAG_Queue.client.serializer.MsgpackSerializer`
+    """
+
+    @staticmethod
+    def dumps(obj) -> bytes:
+        return ormsgpack.packb(obj)
+
+    @staticmethod
+    def loads(data: bytes):
+        return ormsgpack.unpackb(data)
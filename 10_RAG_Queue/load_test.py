@@ -0,0 +1,72 @@
+"""
+Load test for the RAG queue server
+---------------------------------
+Fires POST /chat requests at increasing concurrency levels and prints the
+requests/sec and latency for each level, so runs before/after a server change
+can be compared side by side (needs the server and a local Redis/Valkey).
+
+Usage:
+    python 10_RAG_Queue/load_test.py --url http://127.0.0.1:8000 --requests 2000 --concurrency 1,16,64,256
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def run_level(client: httpx.AsyncClient, url: str, total: int, concurrency: int):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def user():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/chat", params={"query": f"load test query {i}"})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            except httpx.HTTPError:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+    return {
+        "concurrency": concurrency,
+        "rps": len(latencies) / elapsed,
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test POST /chat")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,16,64,256", help="Comma separated concurrency levels")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+
+    print(f"{'conc':>6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'errors':>7}")
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        for level in levels:
+            r = await run_level(client, args.url, args.requests, level)
+            print(f"{r['concurrency']:>6} {r['rps']:>9.1f} {r['p50']:>8.1f} {r['p95']:>8.1f} "
+                  f"{r['p99']:>8.1f} {r['mean']:>8.1f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""
+Micro-batching
+---------------------------------
+Jobs running concurrently in one worker process (run_worker.py --mode threads)
+call submit() with a single query. A background thread collects everything
+submitted within `window_ms` of the first item (up to `max_batch` items), runs
+the handler once on the whole batch and hands every caller its own result.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    def __init__(self, handler, max_batch: int = 32, window_ms: float = 10):
+        self.handler = handler  # list of items -> list of results (same order)
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_thread(self):
+        # Threads don't survive fork(): start one per process, on first use
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._loop, daemon=True, name="micro-batcher").start()
+                self._pid = os.getpid()
+
+    def submit(self, item):
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]  # wait for the first item as long as needed
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            futures = [future for _, future in batch]
+            try:
+                results = self.handler([item for item, _ in batch])
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
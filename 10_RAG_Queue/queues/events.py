@@ -0,0 +1,130 @@
+"""
+Job completion events
+---------------------------------
+The worker publishes the outcome of every job on a Redis pub/sub channel
+(RQ success/failure callbacks), so the server can push it to waiting clients
+instead of clients polling /job-status in a loop.
+
+RQ runs the success callback *before* it stores the return value, so the
+result itself travels in the message (packed with the job's serializer).
+
+The server side is ONE pattern subscription (JobEvents) that hands messages to
+in-process futures: a waiting client costs a future, not a Redis connection.
+Waiters are capped (RAG_MAX_WAITERS); past the cap wait() raises TooManyWaiters.
+"""
+
+import asyncio
+import os
+from fastapi.concurrency import run_in_threadpool
+from rq.job import JobStatus
+
+DONE = (JobStatus.FINISHED, JobStatus.FAILED, JobStatus.STOPPED, JobStatus.CANCELED)
+MAX_WAITERS = int(os.getenv("RAG_MAX_WAITERS", 2000))
+
+
+def job_channel(job_id: str) -> str:
+    return f"rag:job:{job_id}"
+
+
+# ---------------------------
+# 📣 WORKER SIDE (RQ callbacks)
+# ---------------------------
+
+def publish_success(job, connection, result, *args, **kwargs):
+    connection.publish(job_channel(job.id), job.serializer.dumps(
+        {"status": JobStatus.FINISHED.value, "result": result}
+    ))
+
+
+def publish_failure(job, connection, type, value, traceback):
+    connection.publish(job_channel(job.id), job.serializer.dumps(
+        {"status": JobStatus.FAILED.value, "result": None, "error": repr(value)}
+    ))
+
+
+# ---------------------------
+# ⏳ SERVER SIDE (asyncio)
+# ---------------------------
+
+def job_outcome(job):
+    status = job.get_status(refresh=True)
+    return {"status": status.value, "result": job.return_value() if status in DONE else None}
+
+
+def is_done(outcome) -> bool:
+    return outcome["status"] in DONE
+
+
+class TooManyWaiters(Exception):
+    pass
+
+
+class JobEvents:
+    def __init__(self, redis, max_waiters: int = MAX_WAITERS):
+        self.redis = redis
+        self.max_waiters = max_waiters
+        self.waiting = 0
+        self._waiters = {}  # job id -> set of futures
+        self._task = None
+        self._ready = None
+
+    @property
+    def full(self) -> bool:
+        return self.waiting >= self.max_waiters
+
+    async def _listen(self):
+        prefix = job_channel("")
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(job_channel("*"))
+                self._ready.set()
+                async for message in pubsub.listen():
+                    job_id = message["channel"].decode().removeprefix(prefix)
+                    for future in self._waiters.pop(job_id, ()):
+                        if not future.done():
+                            future.set_result(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # connection lost: waiters fall back to their timeout
+                self._ready.clear()
+                print(f"⚠️ job events: {e!r}, resubscribing")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def _ensure_listener(self):
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._task = asyncio.create_task(self._listen())
+        try:
+            await asyncio.wait_for(self._ready.wait(), 5)
+        except asyncio.TimeoutError:
+            raise ConnectionError("job events: not subscribed to Redis") from None
+
+    async def wait(self, job, timeout: float):
+        """Wait until the job is done or the timeout expires; returns {status, result} either way."""
+        if self.full:
+            raise TooManyWaiters(f"{self.waiting} clients already waiting")
+        await self._ensure_listener()
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(job.id, set()).add(future)
+        self.waiting += 1
+        try:
+            # Register first, then check: a job finishing in between is not missed
+            outcome = await run_in_threadpool(job_outcome, job)
+            if is_done(outcome):
+                return outcome
+            try:
+                data = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                return outcome
+            return job.serializer.loads(data)
+        finally:
+            self.waiting -= 1
+            waiters = self._waiters.get(job.id)
+            if waiters is not None:
+                waiters.discard(future)
+                if not waiters:
+                    del self._waiters[job.id]
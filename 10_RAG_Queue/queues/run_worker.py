@@ -0,0 +1,112 @@
+"""
+Warm RQ worker pool
+---------------------------------
+The default `rq worker` imports queues/worker.py per process and forks a fresh
+work horse per job, so cold jobs pay for loading the model. This entry point
+loads the model once in the parent and then runs a fixed pool of warm workers:
+
+- fork mode (default): N forked children, each a SimpleWorker (no fork per job)
+- threads mode: N SimpleWorker threads inside a single process sharing one model;
+  queries from concurrent jobs are micro-batched into one embed + one search call
+
+Usage:
+    python -m 10_RAG_Queue.queues.run_worker --workers 4
+    python -m 10_RAG_Queue.queues.run_worker --workers 8 --mode threads --batch-window-ms 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import threading
+from redis import Redis
+from rq import Queue, SimpleWorker
+from rq.timeouts import TimerDeathPenalty
+from ..client.rq_client import QUEUE_NAMES, REDIS_HOST, REDIS_PORT
+from ..client.serializer import MsgpackSerializer
+from . import worker
+
+
+class ThreadWorker(SimpleWorker):
+    # SIGALRM based job timeouts and signal handlers only work in the main thread
+    death_penalty_class = TimerDeathPenalty
+
+    def _install_signal_handlers(self):
+        pass
+
+
+def make_connection():
+    return Redis(host=REDIS_HOST, port=REDIS_PORT, health_check_interval=30)
+
+
+def run_child(queue_names, torch_threads: int):
+    import torch
+
+    # Split the cores between children instead of every child using all of them
+    torch.set_num_threads(torch_threads)
+    worker.warm_up()
+
+    connection = make_connection()
+    queues = [Queue(name, connection=connection, serializer=MsgpackSerializer) for name in queue_names]
+    SimpleWorker(queues, connection=connection, serializer=MsgpackSerializer).work()
+
+
+def run_forked(queue_names, workers: int):
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    ctx = multiprocessing.get_context("fork")
+    children = [
+        ctx.Process(target=run_child, args=(queue_names, torch_threads), name=f"rag-worker-{i}")
+        for i in range(workers)
+    ]
+    for child in children:
+        child.start()
+    print(f"🔥 {workers} warm workers started: {[child.pid for child in children]}")
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+
+
+def run_threads(queue_names, workers: int, batch_window_ms: float, max_batch: int):
+    worker.configure_batching(batch_window_ms, max_batch)
+    worker.warm_up()
+
+    def run():
+        connection = make_connection()
+        queues = [Queue(name, connection=connection, serializer=MsgpackSerializer) for name in queue_names]
+        ThreadWorker(queues, connection=connection, serializer=MsgpackSerializer).work()
+
+    threads = [threading.Thread(target=run, daemon=True, name=f"rag-worker-{i}") for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    print(f"🔥 {workers} warm worker threads started")
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm RQ worker pool for the RAG queue")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--mode", choices=["fork", "threads"], default="fork")
+    parser.add_argument("--queues", default=",".join(QUEUE_NAMES), help="Comma separated queue names, highest priority first")
+    parser.add_argument("--batch-window-ms", type=float, default=10, help="threads mode: micro-batching window (0 = off)")
+    parser.add_argument("--max-batch", type=int, default=32, help="threads mode: max queries per batch")
+    args = parser.parse_args()
+
+    queue_names = args.queues.split(",")
+
+    print("⏳ Preloading embedding model...")
+    worker.preload()
+
+    if args.mode == "fork":
+        run_forked(queue_names, args.workers)
+    else:
+        run_threads(queue_names, args.workers, args.batch_window_ms, args.max_batch)
+
+
+if __name__ == "__main__":
+    main()
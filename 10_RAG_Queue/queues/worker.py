@@ -1,16 +1,309 @@
-from langchain_community.embeddings import HuggingFaceEmbeddings
+import os
+import sys
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient, models
+from rq import get_current_job
 
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Shared RAG helpers (embedding service, ...) live next to the indexing scripts
+RAG_DIR = Path(__file__).resolve().parents[2] / "09_RAG_LangChain"
+sys.path.append(str(RAG_DIR))
+from rag.embeddings import get_embedding_service
+from rag.bm25 import DEFAULT_PATH as BM25_PATH, BM25Index
+from rag.hybrid import HybridRetriever, is_lexical_query
+from rag.rerank import Reranker
+from rag.context import dedupe_hits, merge_hits
+from rag.filters import MetadataFilter
+from rag.quantization import search_params
+from rag.semantic_cache import SemanticCache
+from rag.vector_index import LocalVectorIndex, fetch_documents, qdrant_document
+from .batcher import MicroBatcher
 
-vector_db = QdrantVectorStore.from_existing_collection(
-    url="http://localhost:6333",   # Qdrant running locally
-    collection_name="learning_rag_hf",
-    embedding=embedding_model
-)
+# qdrant -> search over the network, local -> in-process index exported by 05_local_index.py
+RAG_BACKEND = os.getenv("RAG_BACKEND", "qdrant")
+LOCAL_INDEX_PATH = os.getenv("RAG_LOCAL_INDEX", str(RAG_DIR / ".cache" / "learning_rag_hf"))
+QDRANT_URL = "http://localhost:6333"   # Qdrant running locally
+COLLECTION_NAME = "learning_rag_hf"
 
-def process_query(query: str):
+# Hybrid search (vector + BM25 with RRF) when the BM25 index built by 01_index.py exists
+RAG_HYBRID = os.getenv("RAG_HYBRID", "1") == "1"
+BM25_INDEX_PATH = os.getenv("RAG_BM25_INDEX", str(BM25_PATH))
+HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", 20))
+
+# Optional cross-encoder rerank of the top RAG_RERANK_CANDIDATES, within a per-query budget
+RAG_RERANK = os.getenv("RAG_RERANK", "0") == "1"
+RERANK_CANDIDATES = int(os.getenv("RAG_RERANK_CANDIDATES", 50))
+RERANK_BUDGET_MS = float(os.getenv("RAG_RERANK_BUDGET_MS", 150))
+
+# Quantized collections (RAG_QUANTIZATION at indexing): rescore oversampling * k candidates with float vectors
+OVERSAMPLING = float(os.getenv("RAG_OVERSAMPLING", 0))
+SEARCH_PARAMS = search_params(OVERSAMPLING) if OVERSAMPLING else None
+
+# Merge overlapping chunks of the same page and drop near-duplicates before returning them
+# (exact shingle Jaccard over the top-k, no MinHash signatures on this path)
+RAG_DEDUP = os.getenv("RAG_DEDUP", "1") == "1"
+
+# Semantic cache: a query this close (cosine) to a recent one gets its results without a search
+RAG_SEMANTIC_CACHE = os.getenv("RAG_SEMANTIC_CACHE", "1") == "1"
+CACHE_THRESHOLD = float(os.getenv("RAG_CACHE_THRESHOLD", 0.92))
+CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", 600))
+CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", 10_000))
+
+# Micro-batching: concurrent queries arriving within the window share one embed + one search.
+# Only useful when several jobs run in one process (run_worker.py --mode threads turns it on),
+# with one job at a time it would just add the window to every job. 0 disables it.
+BATCH_WINDOW_MS = float(os.getenv("RAG_BATCH_WINDOW_MS", 0))
+MAX_BATCH = int(os.getenv("RAG_MAX_BATCH", 32))
+
+# Results only carry a short snippet; the full chunk text is fetched on demand (GET /chunk)
+SNIPPET_CHARS = int(os.getenv("RAG_SNIPPET_CHARS", 200))
+# Hard cap on the stored result: snippets are dropped if the result would be bigger
+MAX_RESULT_BYTES = int(os.getenv("RAG_MAX_RESULT_BYTES", 16 * 1024))
+# The cap is checked on an estimate; RAG_MEASURE_RESULT=1 also serializes the result to
+# report its exact size (RQ serializes it again to store it, so that costs a full extra pass)
+MEASURE_RESULT = os.getenv("RAG_MEASURE_RESULT", "0") == "1"
+
+# The model is loaded on first use (or by preload() in run_worker.py), not at import time
+embedding_model = get_embedding_service()  # shared all-MiniLM-L6-v2 service
+
+_vector_db = None
+_bm25 = None
+_hybrid = None
+reranker = Reranker(budget_ms=RERANK_BUDGET_MS) if RAG_RERANK else None
+semantic_cache = SemanticCache(CACHE_THRESHOLD, CACHE_TTL, CACHE_SIZE) if RAG_SEMANTIC_CACHE else None
+_bm25_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bm25")
+
+def get_vector_db():
+    global _vector_db
+    if _vector_db is None:
+        if RAG_BACKEND == "local":
+            _vector_db = LocalVectorIndex.load(LOCAL_INDEX_PATH, embedding=embedding_model)
+        else:
+            _vector_db = QdrantVectorStore.from_existing_collection(
+                url=QDRANT_URL,
+                collection_name=COLLECTION_NAME,
+                embedding=embedding_model
+            )
+    return _vector_db
+
+_chunk_client = None
+
+def get_chunk_client():
+    """Plain QdrantClient for fetching chunks by id; unlike the vector store it needs no embedding model."""
+    global _chunk_client
+    if _chunk_client is None:
+        _chunk_client = QdrantClient(url=QDRANT_URL)
+    return _chunk_client
+
+def get_bm25():
+    global _bm25
+    if _bm25 is None and RAG_HYBRID:
+        _bm25 = BM25Index.load_if_exists(BM25_INDEX_PATH) or False
+    return _bm25 or None
+
+def get_hybrid():
+    """HybridRetriever over the vector db, or None (hybrid disabled / no BM25 index)."""
+    global _hybrid
+    if _hybrid is None and get_bm25() is not None:
+        _hybrid = HybridRetriever(get_vector_db(), get_bm25(), candidates=HYBRID_CANDIDATES)
+    return _hybrid
+
+def preload():
+    """Runs once in the parent worker process, before the children are forked."""
+    embedding_model.model  # model weights end up in copy-on-write pages shared by every child
+    if RAG_BACKEND == "local":
+        get_vector_db()    # memory-mapped index, shared the same way
+    get_bm25()             # BM25 sparse matrix, shared the same way
+    if reranker is not None:
+        reranker.model     # cross-encoder weights too
+
+def warm_up():
+    """Runs in every child: first forward pass + its own Qdrant connection (sockets are not fork-safe)."""
+    embedding_model.warm_up()
+    get_vector_db()
+
+def search_by_vectors(vectors, k: int = 3, flt: MetadataFilter = None):
+    """One batched vector search, one list of (Document, score) per query vector."""
+    vector_db = get_vector_db()
+    if isinstance(vector_db, LocalVectorIndex):
+        return vector_db.similarity_search_with_score_batch_by_vector(vectors, k=k, filter=flt)
+
+    query_filter = flt.to_qdrant() if flt else None
+    responses = vector_db.client.query_batch_points(
+        collection_name=vector_db.collection_name,
+        requests=[
+            models.QueryRequest(
+                query=vector.tolist(), filter=query_filter, params=SEARCH_PARAMS, limit=k, with_payload=True
+            )
+            for vector in vectors
+        ]
+    )
+    return [
+        [(qdrant_document(point, vector_db.collection_name), point.score) for point in response.points]
+        for response in responses
+    ]
+
+def get_chunks(ids):
+    """Full text + metadata for chunk ids (the on-demand part of the compact results).
+
+    Runs in the API server: QdrantVectorStore.from_existing_collection would embed a test
+    string and load MiniLM there, so Qdrant is asked directly.
+    """
+    ids = list(ids)
+    if RAG_BACKEND == "local":
+        return fetch_documents(get_vector_db(), ids)  # memory-mapped arrays, no model either
+    if not ids:
+        return []
+    points = get_chunk_client().retrieve(collection_name=COLLECTION_NAME, ids=ids, with_payload=True)
+    return [qdrant_document(point, COLLECTION_NAME) for point in points]
+
+def compact_result(doc, score: float, snippet_chars: int = SNIPPET_CHARS, score_key: str = "score"):
+    """score_key names what the score is: "score" (vector similarity), "rrf_score", "bm25_score", "rerank_score"."""
+    result = {
+        "id": doc.metadata.get("_id"),
+        score_key: round(float(score), 4),
+        "page": doc.metadata.get("page_label", doc.metadata.get("page")),
+        "source": doc.metadata.get("source"),
+    }
+    if "_merged_ids" in doc.metadata:
+        result["ids"] = doc.metadata["_merged_ids"]  # all the chunks stitched into this one
+    if snippet_chars:
+        result["snippet"] = doc.page_content[:snippet_chars]
+    return result
+
+def search_queries(queries, k: int = 3, flt: MetadataFilter = None):
+    """Embed + search a batch of queries (same filter for all); returns (results, timings) per query."""
+    timings = {"batch_size": len(queries)}
+    hybrid = get_hybrid()
+    final_k = k
+    if reranker is not None:
+        k = max(k, RERANK_CANDIDATES)  # retrieve wide, the reranker picks the final k
+
+    # Keyword-looking queries with BM25 hits skip the embedding model and the vector search
+    lexical_hits = {}
+    if hybrid is not None:
+        for i, query in enumerate(queries):
+            if is_lexical_query(query):
+                hits = hybrid.bm25.search(query.strip('"'), k, filter=flt)
+                if hits:
+                    lexical_hits[i] = hits
+    dense_rows = [i for i in range(len(queries)) if i not in lexical_hits]
+
+    start = time.perf_counter()
+    vectors = embedding_model.embed([queries[i] for i in dense_rows]) if dense_rows else None
+    timings["embed"] = time.perf_counter() - start
+
+    # Semantic cache, on the batch's own vectors: hits skip search, rerank and dedup
+    cached = {}
+    if semantic_cache is not None and dense_rows:
+        start = time.perf_counter()
+        for i, vector in zip(dense_rows, vectors):
+            entry, similarity = semantic_cache.lookup(vector, namespace=flt)
+            if entry is not None:
+                cached[i] = (entry["value"], similarity)
+        timings["cache_lookup"] = time.perf_counter() - start
+    search_rows = [i for i in dense_rows if i not in cached]
+    search_vectors = vectors[[j for j, i in enumerate(dense_rows) if i not in cached]] if search_rows else None
+
+    if hybrid is not None:
+        # BM25 runs on another thread while this one does the vector search
+        sparse_future = _bm25_pool.submit(
+            lambda: [hybrid.bm25.search(queries[i], max(HYBRID_CANDIDATES, k), filter=flt) for i in search_rows]
+        )
+
+    start = time.perf_counter()
+    search_k = max(HYBRID_CANDIDATES, k) if hybrid else k
+    results = dict(zip(search_rows, search_by_vectors(search_vectors, k=search_k, flt=flt))) if search_rows else {}
+    score_keys = dict.fromkeys(results, "score")
+    if hybrid is not None:
+        results = {i: hybrid.fuse(results[i], sparse, k) for i, sparse in zip(search_rows, sparse_future.result())}
+        results.update({i: hybrid.lexical(hits, k) for i, hits in lexical_hits.items()})
+        score_keys = {i: "bm25_score" if i in lexical_hits else "rrf_score" for i in results}
+    timings["search"] = time.perf_counter() - start
+
+    if reranker is not None:
+        start = time.perf_counter()
+        for i, hits in results.items():
+            reranked = reranker.rerank(queries[i], hits, k=final_k)
+            if reranked != hits[:final_k]:  # over the budget it returns the retrieval hits as they were
+                score_keys[i] = "rerank_score"
+            results[i] = reranked
+        timings["rerank"] = time.perf_counter() - start
+
+    if RAG_DEDUP:
+        start = time.perf_counter()
+        results = {i: dedupe_hits(merge_hits(hits)) for i, hits in results.items()}
+        timings["dedup"] = time.perf_counter() - start
+
+    results = {
+        i: [compact_result(doc, score, score_key=score_keys[i]) for doc, score in hits]
+        for i, hits in results.items()
+    }
+    if semantic_cache is not None:
+        for j, i in enumerate(dense_rows):
+            if i in results:
+                semantic_cache.store(vectors[j], queries[i], results[i], namespace=flt)
+
+    output = []
+    for i in range(len(queries)):
+        if i in cached:
+            value, similarity = cached[i]
+            output.append((value, {**timings, "cache_hit": f"similarity {similarity:.3f}"}))
+        else:
+            output.append((results[i], dict(timings)))
+    return output
+
+batcher = None
+
+def configure_batching(window_ms: float, max_batch: int = MAX_BATCH):
+    global batcher
+    batcher = MicroBatcher(search_queries, max_batch=max_batch, window_ms=window_ms) if window_ms > 0 else None
+
+configure_batching(BATCH_WINDOW_MS)
+
+def estimate_result_bytes(results) -> int:
+    """Upper-bound-ish msgpack size of compact results, without serializing them."""
+    total = 8
+    for result in results:
+        # keys + id + score + page + source: ~100 bytes with a short source name
+        total += 100 + len(str(result.get("source") or "")) + 40 * len(result.get("ids", ()))
+        # utf-8 takes up to 4 bytes per char; snippets are mostly ASCII, 2 is a safe margin
+        total += 2 * len(result.get("snippet", ""))
+    return total
+
+def format_timing(name, value):
+    return f"{name}: {value * 1000:.1f}ms" if isinstance(value, float) else f"{name}: {value}"
+
+def process_query(query: str, filters: dict = None):
+    """filters: MetadataFilter.build() arguments, e.g. {"source": "nodejs.pdf", "pages": [10, 40]}"""
     print("Searching Chunks", query)
-    search_results = vector_db.similarity_search(query=query, k=3)
+    job = get_current_job()
+    flt = MetadataFilter.build(**filters) if filters else None
+
+    # Micro-batches share one filter, so only unfiltered queries are batched
+    if batcher is not None and flt is None:
+        search_results, timings = batcher.submit(query)
+    else:
+        search_results, timings = search_queries([query], flt=flt)[0]
+
+    if job is not None:
+        if job.enqueued_at and job.started_at:
+            timings["queue_wait"] = (job.started_at - job.enqueued_at).total_seconds()
+        if estimate_result_bytes(search_results) > MAX_RESULT_BYTES:
+            search_results = [{k: v for k, v in r.items() if k != "snippet"} for r in search_results]
+        timings["result_bytes_est"] = estimate_result_bytes(search_results)
+        if MEASURE_RESULT:
+            # Same serializer RQ uses to store the result
+            start = time.perf_counter()
+            timings["result_bytes"] = len(job.serializer.dumps(search_results))
+            timings["serialize"] = time.perf_counter() - start
+        job.meta["timings"] = timings
+        if semantic_cache is not None:
+            job.meta["semantic_cache"] = semantic_cache.stats()
+        job.save_meta()
+
     print(f"🤖: {search_results}")
-    return search_results
\ No newline at end of file
+    print("⏱️", " | ".join(format_timing(name, value) for name, value in timings.items()))
+    return search_results
@@ -1,22 +1,128 @@
-from fastapi import FastAPI, Query
-from .client.rq_client import queue
-from .queues.worker import process_query
+import math
+from typing import Literal
+import anyio.to_thread
+import orjson
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from rq import Callback
+from .client.rq_client import (
+    EXPECTED_JOBS_PER_SEC, FAILURE_TTL, JOB_TTL, MAX_QUEUE_DEPTH, REDIS_POOL_SIZE, RESULT_TTL,
+    async_redis, events_redis, fetch_job, queues
+)
+from .queues.events import JobEvents, TooManyWaiters, is_done, job_outcome, publish_failure, publish_success
+from .queues.worker import get_chunks, process_query
 
-app = FastAPI()
+# Results are small plain dicts: orjson skips FastAPI's jsonable_encoder pass
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# One Redis subscription shared by every long-poll / SSE client
+events = JobEvents(events_redis)
+
+@app.on_event("startup")
+async def size_threadpool():
+    # Sync RQ calls hold one pooled connection per thread: anyio's default of 40 threads
+    # would leave part of the Redis pool unused
+    anyio.to_thread.current_default_thread_limiter().total_tokens = REDIS_POOL_SIZE
+
+def too_many_waiters():
+    return HTTPException(
+        status_code=503,
+        detail=f"Too many clients waiting ({events.waiting}), poll /job-status without wait",
+        headers={"Retry-After": "1"}
+    )
+
+async def get_job(job_id: str):
+    # RQ is sync: its Redis calls go through the thread pool, never on the event loop
+    job = await run_in_threadpool(fetch_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
 
 @app.get("/")
-def root():
+async def root():
     return {"status": "Server is up and running"}
 
 @app.post('/chat')
-def chat(query: str = Query(..., description="The Chat query of user")):
-    job = queue.enqueue(process_query, query)
-    return { "status": "queued", "job_id": job.id }
+async def chat(
+        query: str = Query(..., description="The Chat query of user"),
+        priority: Literal["interactive", "bulk"] = Query("interactive", description="Queue to use"),
+        source: list[str] = Query(None, description="Only search these source files (file names, e.g. nodejs.pdf)"),
+        page_from: int = Query(None, ge=0, description="First page to search (0-based)"),
+        page_to: int = Query(None, ge=0, description="Last page to search (0-based, inclusive)")
+):
+    queue = queues[priority]
+    filters = {}
+    if source:
+        filters["source"] = source
+    if page_from is not None or page_to is not None:
+        filters["pages"] = [page_from, page_to]
+
+    # Backpressure: refuse new work instead of letting the queue (and Redis) grow without bound.
+    # LLEN on the async client (what queue.count runs), so enqueue is the only thread pool hop
+    depth = await async_redis.llen(queue.key)
+    if depth >= MAX_QUEUE_DEPTH[priority]:
+        retry_after = max(1, math.ceil(depth / EXPECTED_JOBS_PER_SEC))
+        raise HTTPException(
+            status_code=429,
+            detail=f"{priority} queue is full ({depth} jobs), retry later",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    job = await run_in_threadpool(
+        queue.enqueue,
+        process_query, query, filters or None,
+        result_ttl=RESULT_TTL,
+        failure_ttl=FAILURE_TTL,
+        ttl=JOB_TTL,
+        # Worker publishes the result the moment the job is done
+        on_success=Callback(publish_success),
+        on_failure=Callback(publish_failure)
+    )
+    return { "status": "queued", "job_id": job.id, "priority": priority }
 
 @app.get('/job-status')
-def get_result(
-        job_id: str = Query(..., description="Job ID")
+async def get_result(
+        job_id: str = Query(..., description="Job ID"),
+        wait: float = Query(0, ge=0, le=30, description="Long-poll: seconds to wait for the result")
 ):
-    job = queue.fetch_job(job_id=job_id)
-    result = job.return_value()
-    return { "result": result }
\ No newline at end of file
+    job = await get_job(job_id)
+    if wait:
+        try:
+            return await events.wait(job, wait)
+        except TooManyWaiters:
+            raise too_many_waiters()
+    return await run_in_threadpool(job_outcome, job)
+
+@app.get('/job-events')
+async def job_events(job_id: str = Query(..., description="Job ID")):
+    """Server-Sent Events: one `status` event now, one `result` event when the job is done."""
+    job = await get_job(job_id)
+    if events.full:
+        raise too_many_waiters()
+
+    async def stream():
+        outcome = await run_in_threadpool(job_outcome, job)
+        yield sse("status", {"status": outcome["status"]})
+        while not is_done(outcome):
+            try:
+                outcome = await events.wait(job, 15)
+            except TooManyWaiters as e:  # filled up after the check above
+                yield sse("error", {"detail": str(e)})
+                return
+            if not is_done(outcome):
+                yield ": keep-alive\n\n"
+        yield sse("result", outcome)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.get('/chunk')
+async def get_chunk(chunk_id: str = Query(..., description="Chunk ID from a job result")):
+    """Full chunk text, for results whose snippet is not enough."""
+    chunks = await run_in_threadpool(get_chunks, [chunk_id])
+    if not chunks:
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    return { "id": chunk_id, "page_content": chunks[0].page_content, "metadata": chunks[0].metadata }
@@ -23,6 +23,10 @@ NEO4J_PASS = os.getenv("NEO4J_PASSWORD", "password")
 
 COLLECTION_NAME = "user_memories"
 
+# QDRANT_QUANTIZATION=int8 -> 768-d vectors searched as 1 byte/dim in RAM
+# (float originals on disk, used to rescore the top candidates)
+QUANTIZED = os.getenv("QDRANT_QUANTIZATION", "") == "int8"
+
 # ---------------------------
 # 🔧 INITIALIZE CLIENTS
 # ---------------------------
@@ -41,7 +45,10 @@ if COLLECTION_NAME in [col.name for col in qdrant.get_collections().collections]
 # Create collection with vector size 768 - matches your embedding size
 qdrant.create_collection(
     collection_name=COLLECTION_NAME,
-    vectors_config=VectorParams(size=768, distance=Distance.COSINE)
+    vectors_config=VectorParams(size=768, distance=Distance.COSINE, on_disk=QUANTIZED or None),
+    quantization_config=models.ScalarQuantization(
+        scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+    ) if QUANTIZED else None
 )
 print(f"Created collection '{COLLECTION_NAME}' with vector size 768.")
 
@@ -82,6 +89,9 @@ def search_memory_from_qdrant(user_id, query_text, limit=5):
         filter=Filter(
             must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))]
         ),
+        params=models.SearchParams(
+            quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+        ) if QUANTIZED else None,
         limit=limit
     )
     results = qdrant.search(collection_name=COLLECTION_NAME, search_request=search_request)
@@ -1,18 +1,27 @@
 from dotenv import load_dotenv
 from openai import OpenAI
-import requests
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 import json
 import os
+import sys
+from pathlib import Path
 
 import asyncio
 import speech_recognition as sr
 from openai.helpers import LocalAudioPlayer
 from openai import AsyncOpenAI
 
+sys.path.append(str(Path(__file__).resolve().parents[1] / "08_Agentic_AI"))
+from agent.history import ConversationBuffer
+from agent.tools import ToolCall, ToolRunner, observe_message, tool_calls
+from agent.commands import run_command
+from agent.weather import get_weather
+
 load_dotenv()
 
+HISTORY_BUDGET_TOKENS = int(os.getenv("HISTORY_BUDGET_TOKENS", "8000"))
+
 client = OpenAI()
 async_client = AsyncOpenAI()
 
@@ -27,25 +36,12 @@ async def tts(speech: str):
         await LocalAudioPlayer().play(response)
 
 
-def run_command(cmd: str):
-    result = os.system(cmd)
-    return result
-
-
-
-def get_weather(city: str):
-    url = f"https://wttr.in/{city.lower()}?format=%C+%t"
-    response = requests.get(url)
-
-    if response.status_code == 200:
-        return f"The weather in {city} is {response.text}"
-    
-    return "Something went wrong"
-
 available_tools = {
     "get_weather": get_weather,
     "run_command": run_command
 }
+# One event loop for the session: get_weather's pooled client lives on it
+tool_runner = ToolRunner(available_tools)
 
 
 SYSTEM_PROMPT = """
@@ -60,13 +56,14 @@ SYSTEM_PROMPT = """
     - Strictly Follow the given JSON output format
     - Only run one step at a time.
     - The sequence of steps is START (where user gives an input), PLAN (That can be multiple times) and finally OUTPUT (which is going to the displayed to the user).
+    - When several independent tool calls are needed (e.g. several commands that don't depend on each other), put them all in ONE TOOL step as a "tools" list. They run in parallel and all outputs come back in one OBSERVE step.
 
     Output JSON Format:
-    { "step": "START" | "PLAN" | "OUTPUT" | "TOOL", "content": "string", "tool": "string", "input": "string" }
+    { "step": "START" | "PLAN" | "OUTPUT" | "TOOL", "content": "string", "tool": "string", "input": "string", "tools": [{ "tool": "string", "input": "string" }] }
 
     Available Tools:
     - get_weather(city: str): Takes city name as an input string and returns the weather info about the city.
-    - run_command(cmd: str): Takes a system linux command as string and executes the command on user's system and returns the output from that command
+    - run_command(cmd: str): Takes a system linux command as string and executes the command on user's system and returns the exit code and the output from that command (long output is truncated, commands are killed after a time limit)
     
     Example 1:
     START: Hey, Can you solve 2 + 3 * 5 / 10
@@ -91,6 +88,13 @@ SYSTEM_PROMPT = """
     PLAN: { "step": "OBSERVE": "tool": "get_weather", "output": "The temp of delhi is cloudy with 20 C" }
     PLAN: { "step": "PLAN": "content": "Great, I got the weather info about delhi" }
     OUTPUT: { "step": "OUTPUT": "content": "The cuurent weather in delhi is 20 C with some cloudy sky." }
+
+    Example 3:
+    START: Which node and npm versions are installed?
+    PLAN: { "step": "PLAN": "content": "User wants two versions, both commands are independent" }
+    PLAN: { "step": "TOOL": "tools": [{ "tool": "run_command", "input": "node --version" }, { "tool": "run_command", "input": "npm --version" }] }
+    PLAN: { "step": "OBSERVE": "results": [{ "tool": "run_command", "input": "node --version", "output": "exit code 0\\nv22.11.0\\n" }, { "tool": "run_command", "input": "npm --version", "output": "exit code 0\\n10.9.0\\n" }] }
+    OUTPUT: { "step": "OUTPUT": "content": "You have node v22.11.0 and npm 10.9.0 installed." }
     
 """
 
@@ -99,10 +103,11 @@ class MyOutputFormat(BaseModel):
     content: Optional[str] = Field(None, description="The optional string content for the step")
     tool: Optional[str] = Field(None, description="The ID of the tool to call.")
     input: Optional[str] = Field(None, description="The input params for the tool")
+    tools: Optional[List[ToolCall]] = Field(None, description="Several tool calls, run in parallel")
 
-message_history = [
-    { "role": "system", "content": SYSTEM_PROMPT },
-]
+# System prompt + recent turns are kept as-is; older turns are compacted once the
+# history outgrows HISTORY_BUDGET_TOKENS (see agent/history.py)
+message_history = ConversationBuffer(SYSTEM_PROMPT)
 
 r = sr.Recognizer() # Speech to Text
 with sr.Microphone() as source: # Mic Access
@@ -115,17 +120,21 @@ with sr.Microphone() as source: # Mic Access
 
         print("Processing Audio... (STT)")
         user_query = r.recognize_google(audio)
-        message_history.append({ "role": "user", "content": user_query })
+        message_history.append("user", user_query)
 
         while True:
+            # Before every call: one long PLAN/TOOL chain can outgrow the budget too
+            if message_history.compact(HISTORY_BUDGET_TOKENS):
+                print(f"🗜️ history compacted to {message_history.total_tokens} tokens")
+
             response = client.chat.completions.parse(
                 model="gpt-4.1",
                 response_format=MyOutputFormat,
-                messages=message_history
+                messages=message_history.chat_messages
             )
 
             raw_result = response.choices[0].message.content
-            message_history.append({"role": "assistant", "content": raw_result})
+            message_history.append("assistant", raw_result)
             
             parsed_result = response.choices[0].message.parsed
 
@@ -134,15 +143,17 @@ with sr.Microphone() as source: # Mic Access
                 continue
 
             if parsed_result.step == "TOOL":
-                tool_to_call = parsed_result.tool
-                tool_input = parsed_result.input
-                print(f"🛠️: {tool_to_call} ({tool_input})")
-
-                tool_response = available_tools[tool_to_call](tool_input)
-                print(f"🛠️: {tool_to_call} ({tool_input}) = {tool_response}")
-                message_history.append({ "role": "developer", "content": json.dumps(
-                    { "step": "OBSERVE", "tool": tool_to_call, "input": tool_input, "output": tool_response}
-                ) })
+                calls = tool_calls(parsed_result)
+                if not calls or any(call.tool not in available_tools for call in calls):
+                    print(f"❌ Invalid or missing tool in response: {parsed_result}")
+                    break
+                for call in calls:
+                    print(f"🛠️: {call.tool} ({call.input})")
+
+                results = tool_runner.run(calls)
+                for result in results:
+                    print(f"🛠️: {result['tool']} ({result['input']}) = {result['output']}")
+                message_history.append("developer", observe_message(results))
                 continue
 
 